@@ -2,44 +2,96 @@
 MVP API - minimal endpoints.
 """
 
+import asyncio
+import json
 import os
+import shutil
 import uuid
-from typing import List
+from typing import Dict, List
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
-from sqlalchemy.orm import Session
+import asyncpg
+from cachetools import TTLCache
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    File,
+    HTTPException,
+    Request,
+    Response,
+    UploadFile,
+    WebSocket,
+    WebSocketDisconnect,
+)
+from sqlalchemy import any_, bindparam, select
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core import get_identities, get_identity
-from app.db import Job, JobStatus, get_db
-from app.schemas import JobCreate, JobProgress, JobResponse
+from app.core import get_identities, get_identities_etag, get_identity
+from app.db import LISTEN_DSN, Job, JobStatus, get_db, job_channel
+from app.paths import UPLOADS_PATH
+from app.schemas import (
+    IdentityDetail,
+    IdentitySummary,
+    JobCreate,
+    JobProgress,
+    JobResponse,
+)
 
 router = APIRouter(prefix="/api", tags=["api"])
 
-# Configuration - paths relative to project root by default
-PROJECT_ROOT = os.path.dirname(
-    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-)
-SHARED_DATA_PATH = os.getenv(
-    "SHARED_DATA_PATH", os.path.join(PROJECT_ROOT, "shared_data")
-)
 
+# Uploads are streamed to disk in chunks of this size
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB
+
+# Filenames uploaded by this process recently - lets create_job skip the
+# stat for the common upload -> create sequence
+_RECENT_UPLOADS = TTLCache(maxsize=10_000, ttl=3600)
+
+# Identities rarely change, so let clients revalidate cheaply
+IDENTITIES_CACHE_CONTROL = "max-age=30"
+
+
+def _identities_not_modified(request: Request, response: Response):
+    """Return a 304 response if the client's cached identities are current."""
+    etag = get_identities_etag()
+    headers = {"ETag": etag, "Cache-Control": IDENTITIES_CACHE_CONTROL}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
 
-@router.get("/identities")
-def list_identities():
+
+@router.get("/identities", response_model=Dict[str, IdentitySummary])
+def list_identities(request: Request, response: Response):
     """Get all available identities to choose from."""
+    not_modified = _identities_not_modified(request, response)
+    if not_modified is not None:
+        return not_modified
     return get_identities()
 
 
-@router.get("/identities/{identity_id}")
-def get_identity_detail(identity_id: str):
+@router.get("/identities/{identity_id}", response_model=IdentityDetail)
+def get_identity_detail(identity_id: str, request: Request, response: Response):
     """Get a single identity with its images."""
+    # Unknown ids are a 404 whatever the client has cached
     identity = get_identity(identity_id)
     if not identity:
         raise HTTPException(status_code=404, detail="Identity not found")
+    not_modified = _identities_not_modified(request, response)
+    if not_modified is not None:
+        return not_modified
     return identity
 
 
+def _save_upload(file: UploadFile, file_path: str):
+    """Stream an upload to disk without holding the whole file in memory."""
+    with open(file_path, "wb") as f:
+        shutil.copyfileobj(file.file, f, length=UPLOAD_CHUNK_SIZE)
+
+
 @router.post("/upload")
 async def upload_video(file: UploadFile = File(...)):
     """Upload user's video. Returns filename to use when creating job."""
@@ -47,19 +99,15 @@ async def upload_video(file: UploadFile = File(...)):
     ext = os.path.splitext(file.filename)[1] or ".mp4"
     filename = f"{uuid.uuid4()}{ext}"
 
-    upload_dir = os.path.join(SHARED_DATA_PATH, "uploads")
-    os.makedirs(upload_dir, exist_ok=True)
-
-    file_path = os.path.join(upload_dir, filename)
-    with open(file_path, "wb") as f:
-        content = await file.read()
-        f.write(content)
+    file_path = os.path.join(UPLOADS_PATH, filename)
+    await asyncio.to_thread(_save_upload, file, file_path)
+    _RECENT_UPLOADS[filename] = True
 
     return {"filename": filename}
 
 
 @router.post("/jobs", response_model=JobResponse)
-def create_job(data: JobCreate, db: Session = Depends(get_db)):
+async def create_job(data: JobCreate, db: AsyncSession = Depends(get_db)):
     """
     Create a new job.
     User has: picked identity, picked image, uploaded video.
@@ -74,8 +122,8 @@ def create_job(data: JobCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail="Invalid image for identity")
 
     # Validate video was uploaded
-    video_path = os.path.join(SHARED_DATA_PATH, "uploads", data.user_video)
-    if not os.path.exists(video_path):
+    video_path = os.path.join(UPLOADS_PATH, data.user_video)
+    if data.user_video not in _RECENT_UPLOADS and not os.path.exists(video_path):
         raise HTTPException(status_code=400, detail="Video not found. Upload first.")
 
     job = Job(
@@ -85,36 +133,135 @@ def create_job(data: JobCreate, db: Session = Depends(get_db)):
         status=JobStatus.PENDING,
         progress=0,
     )
+    # id/created_at come back from INSERT ... RETURNING (eager_defaults)
     db.add(job)
-    db.commit()
-    db.refresh(job)
+    await db.commit()
     return job
 
 
 @router.get("/jobs/{job_id}/progress", response_model=JobProgress)
-def get_progress(job_id: UUID, db: Session = Depends(get_db)):
-    """Poll this for progress updates."""
-    job = db.query(Job).filter(Job.id == job_id).first()
+async def get_progress(job_id: UUID, db: AsyncSession = Depends(get_db)):
+    """Poll this for progress updates (fallback for the WebSocket endpoint)."""
+    result = await db.execute(
+        select(Job.status, Job.progress).where(Job.id == job_id)
+    )
+    job = result.first()
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     return JobProgress(status=job.status, progress=job.progress)
 
 
+def _progress_message(status: str, progress: int) -> dict:
+    """Build a JobProgress payload from raw DB values (status is the enum name)."""
+    return JobProgress(status=JobStatus[status], progress=progress).model_dump(
+        mode="json"
+    )
+
+
+async def _wait_for_disconnect(websocket: WebSocket):
+    """Return once the client disconnects (anything it sends is ignored)."""
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return
+
+
+@router.websocket("/jobs/{job_id}/progress/ws")
+async def progress_ws(websocket: WebSocket, job_id: UUID):
+    """
+    Push progress updates as they happen (PostgreSQL LISTEN/NOTIFY).
+
+    Sends the current state on connect, then one message per update until
+    the job completes or fails. The HTTP progress endpoint is the fallback.
+
+    Each socket holds its own LISTEN connection, so a client disconnect
+    ends the wait for the next update and closes the connection at once.
+    """
+    await websocket.accept()
+
+    updates: asyncio.Queue = asyncio.Queue()
+    conn = None
+    disconnected = asyncio.create_task(_wait_for_disconnect(websocket))
+    try:
+        conn = await asyncpg.connect(LISTEN_DSN)
+        # Subscribe before reading the current state so no update is missed
+        await conn.add_listener(
+            job_channel(job_id),
+            lambda _conn, _pid, _channel, payload: updates.put_nowait(payload),
+        )
+
+        row = await conn.fetchrow(
+            "SELECT status, progress FROM jobs WHERE id = $1", job_id
+        )
+        if row is None:
+            disconnected.cancel()
+            await websocket.close(code=4404, reason="Job not found")
+            return
+
+        message = _progress_message(row["status"], row["progress"])
+        while True:
+            await websocket.send_json(message)
+            if message["status"] in (JobStatus.COMPLETED, JobStatus.FAILED):
+                break
+            # Wait for the next update or the client going away
+            update = asyncio.ensure_future(updates.get())
+            await asyncio.wait(
+                {update, disconnected}, return_when=asyncio.FIRST_COMPLETED
+            )
+            if not update.done():
+                update.cancel()
+                return
+            data = json.loads(update.result())
+            message = _progress_message(data["status"], data["progress"])
+
+        disconnected.cancel()
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        disconnected.cancel()
+        if conn is not None:
+            await conn.close()
+
+
+@router.post("/jobs/batch", response_model=List[JobResponse])
+async def get_jobs(ids: List[UUID] = Body(...), db: AsyncSession = Depends(get_db)):
+    """Get several jobs in one query. Unknown IDs are omitted."""
+    if not ids:
+        return []
+    # Bind the IDs as a single array parameter: WHERE id = ANY(:ids)
+    ids_param = bindparam("ids", ids, type_=ARRAY(PG_UUID(as_uuid=True)))
+    result = await db.execute(select(Job).where(Job.id == any_(ids_param)))
+    return result.scalars().all()
+
+
 @router.get("/jobs/{job_id}", response_model=JobResponse)
-def get_job(job_id: UUID, db: Session = Depends(get_db)):
+async def get_job(job_id: UUID, db: AsyncSession = Depends(get_db)):
     """Get full job details."""
-    job = db.query(Job).filter(Job.id == job_id).first()
+    result = await db.execute(select(Job).where(Job.id == job_id))
+    job = result.scalar_one_or_none()
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     return job
 
 
 @router.get("/library", response_model=List[JobResponse])
-def get_library(db: Session = Depends(get_db)):
+async def get_library(db: AsyncSession = Depends(get_db)):
     """Get user's completed jobs (their library)."""
-    return (
-        db.query(Job)
-        .filter(Job.status == JobStatus.COMPLETED)
+    # Select only the columns JobResponse needs - plain rows, no ORM objects
+    result = await db.execute(
+        select(
+            Job.id,
+            Job.identity_id,
+            Job.identity_image,
+            Job.user_video,
+            Job.status,
+            Job.progress,
+            Job.output_video,
+            Job.error,
+            Job.created_at,
+        )
+        .where(Job.status == JobStatus.COMPLETED)
         .order_by(Job.created_at.desc())
-        .all()
     )
+    return [JobResponse.model_validate(row._mapping) for row in result.all()]
@@ -1,4 +1,3 @@
-from app.core.identities import get_identities, get_identity, get_identity_image_path, get_identity_audio_path, IDENTITIES_PATH
-
-__all__ = ["get_identities", "get_identity", "get_identity_image_path", "get_identity_audio_path", "IDENTITIES_PATH"]
+from app.core.identities import get_identities, get_identities_etag, get_identity, get_identity_image_path, get_identity_audio_path, IDENTITIES_PATH
 
+__all__ = ["get_identities", "get_identities_etag", "get_identity", "get_identity_image_path", "get_identity_audio_path", "IDENTITIES_PATH"]
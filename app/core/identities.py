@@ -16,83 +16,148 @@ Directory structure:
         └── voice.wav
 """
 
+import functools
+import hashlib
 import os
 from typing import Optional
 
-# Base path for identity assets - relative to project root by default
-PROJECT_ROOT = os.path.dirname(
-    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-)
-IDENTITIES_PATH = os.getenv("IDENTITIES_PATH", os.path.join(PROJECT_ROOT, "identities"))
+from app.paths import IDENTITIES_PATH
 
 # Supported file extensions
 IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
 AUDIO_EXTENSIONS = {".wav", ".mp3", ".flac", ".m4a"}
 
+# Extension -> kind, so each file needs a single dict lookup
+_EXT_KIND = {
+    **{ext: "img" for ext in IMAGE_EXTENSIONS},
+    **{ext: "aud" for ext in AUDIO_EXTENSIONS},
+}
 
-def _discover_identities() -> dict:
+# Discovery cache - root mtime plus per-folder mtimes (nanoseconds).
+# A folder's mtime changes whenever files are added, removed or renamed in it.
+_CACHE = {"root_mtime": None, "dir_mtimes": {}, "data": {}}
+
+
+def _scan_identity(folder_name: str, folder_path: str) -> Optional[dict]:
+    """Scan a single identity folder. Returns None if it is incomplete."""
+    # Find all images and audio files
+    with os.scandir(folder_path) as it:
+        filenames = sorted(
+            sub.name for sub in it if sub.is_file(follow_symlinks=False)
+        )
+
+    images = []
+    audio = None
+
+    for filename in filenames:
+        dot = filename.rfind(".")
+        kind = _EXT_KIND.get(filename[dot:].lower()) if dot > 0 else None
+
+        if kind == "img":
+            images.append(filename)
+        elif kind == "aud" and audio is None:
+            # Use first audio file found
+            audio = filename
+
+    # Only add identity if it has at least one image and audio
+    if not (images and audio):
+        return None
+
+    # Create display name from folder name
+    display_name = folder_name.replace("_", " ").replace("-", " ").title()
+
+    return {
+        "name": display_name,
+        "images": images,
+        "audio": audio,
+    }
+
+
+def _discover_identities(force: bool = False) -> dict:
     """
     Auto-discover identities from the identities folder.
 
     Each subfolder is an identity. Images and audio are auto-detected.
+    Folders whose mtime is unchanged since the last scan are reused from
+    the cache; pass force=True to re-scan everything.
     """
-    identities = {}
-
     if not os.path.exists(IDENTITIES_PATH):
-        return identities
+        _CACHE.update(root_mtime=None, dir_mtimes={}, data={})
+        return {}
+
+    root_mtime = os.stat(IDENTITIES_PATH).st_mtime_ns
+
+    # DirEntry caches the file type from readdir, so no extra stat per entry
+    with os.scandir(IDENTITIES_PATH) as it:
+        dir_mtimes = {
+            entry.name: entry.stat(follow_symlinks=False).st_mtime_ns
+            for entry in it
+            # Skip hidden folders
+            if entry.is_dir(follow_symlinks=False) and not entry.name.startswith(".")
+        }
 
-    for folder_name in os.listdir(IDENTITIES_PATH):
-        folder_path = os.path.join(IDENTITIES_PATH, folder_name)
+    if (
+        not force
+        and root_mtime == _CACHE["root_mtime"]
+        and dir_mtimes == _CACHE["dir_mtimes"]
+    ):
+        return _CACHE["data"]
 
-        if not os.path.isdir(folder_path):
-            continue
+    cached_mtimes = {} if force else _CACHE["dir_mtimes"]
+    cached_data = _CACHE["data"]
+    identities = {}
 
-        # Skip hidden folders
-        if folder_name.startswith("."):
+    for folder_name, mtime in dir_mtimes.items():
+        if cached_mtimes.get(folder_name) == mtime:
+            # Unchanged folder - reuse previous result (absent means incomplete)
+            if folder_name in cached_data:
+                identities[folder_name] = cached_data[folder_name]
             continue
 
-        # Find all images and audio files
-        images = []
-        audio = None
-
-        for filename in sorted(os.listdir(folder_path)):
-            file_path = os.path.join(folder_path, filename)
-            if not os.path.isfile(file_path):
-                continue
-
-            ext = os.path.splitext(filename)[1].lower()
-
-            if ext in IMAGE_EXTENSIONS:
-                images.append(filename)
-            elif ext in AUDIO_EXTENSIONS and audio is None:
-                # Use first audio file found
-                audio = filename
+        identity = _scan_identity(
+            folder_name, os.path.join(IDENTITIES_PATH, folder_name)
+        )
+        if identity:
+            identities[folder_name] = identity
 
-        # Only add identity if it has at least one image and audio
-        if images and audio:
-            # Create display name from folder name
-            display_name = folder_name.replace("_", " ").replace("-", " ").title()
+    _CACHE.update(root_mtime=root_mtime, dir_mtimes=dir_mtimes, data=identities)
+    return identities
 
-            identities[folder_name] = {
-                "name": display_name,
-                "images": images,
-                "audio": audio,
-            }
 
-    return identities
+def _compute_etag(identities: dict) -> str:
+    """Short content hash of the identity dict, used as an HTTP ETag."""
+    digest = hashlib.blake2b(repr(identities).encode(), digest_size=8).hexdigest()
+    return f'"{digest}"'
 
 
 # Discover identities on module load
 IDENTITIES = _discover_identities()
+IDENTITIES_ETAG = _compute_etag(IDENTITIES)
+
 
+def refresh_identities(force: bool = False):
+    """Re-scan the identities folder. Call after adding new identities.
 
-def refresh_identities():
-    """Re-scan the identities folder. Call after adding new identities."""
-    global IDENTITIES
-    IDENTITIES = _discover_identities()
+    Unchanged folders are served from the mtime cache unless force=True.
+    """
+    global IDENTITIES, IDENTITIES_ETAG
+    identities = _discover_identities(force=force)
+    if identities is not IDENTITIES:
+        IDENTITIES = identities
+        IDENTITIES_ETAG = _compute_etag(IDENTITIES)
+        get_identities.cache_clear()
+        get_identity.cache_clear()
     return IDENTITIES
 
 
+def get_identities_etag() -> str:
+    """Return the ETag for the current identity set."""
+    return IDENTITIES_ETAG
+
+
+# Views below are memoized until the next refresh_identities() that finds
+# changes - callers must treat the returned dicts as read-only.
+@functools.lru_cache(maxsize=None)
 def get_identities() -> dict:
     """Return all available identities."""
     return {
@@ -105,6 +170,7 @@ def get_identities() -> dict:
     }
 
 
+@functools.lru_cache(maxsize=256)
 def get_identity(identity_id: str) -> Optional[dict]:
     """Get a single identity by ID."""
     if identity_id not in IDENTITIES:
@@ -1,4 +1,4 @@
-from app.db.database import Base, engine, get_db, init_db, SessionLocal
+from app.db.database import AsyncSessionLocal, Base, async_engine, engine, get_db, init_db, job_channel, JOB_PENDING_CHANNEL, LISTEN_DSN, SessionLocal
 from app.db.models import Job, JobStatus
 
-__all__ = ["Base", "engine", "get_db", "init_db", "SessionLocal", "Job", "JobStatus"]
+__all__ = ["AsyncSessionLocal", "Base", "async_engine", "engine", "get_db", "init_db", "job_channel", "JOB_PENDING_CHANNEL", "LISTEN_DSN", "SessionLocal", "Job", "JobStatus"]
@@ -2,13 +2,14 @@
 Minimal database models for MVP.
 """
 import enum
-import uuid
-from datetime import datetime
-from sqlalchemy import Column, String, DateTime, Integer, Text, Enum
+from sqlalchemy import Column, String, DateTime, Integer, Text, Enum, text
 from sqlalchemy.dialects.postgresql import UUID
 
 from app.db.database import Base
 
+# Timestamps are stored as naive UTC
+UTC_NOW = text("(NOW() AT TIME ZONE 'utc')")
+
 
 class JobStatus(str, enum.Enum):
     PENDING = "pending"
@@ -20,8 +21,12 @@ class JobStatus(str, enum.Enum):
 class Job(Base):
     """Job queue - one row per video generation request."""
     __tablename__ = "jobs"
+    # Fetch server-generated defaults via INSERT ... RETURNING
+    __mapper_args__ = {"eager_defaults": True}
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(
+        UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()")
+    )
     
     # User's uploaded video
     user_video = Column(String(500), nullable=False)
@@ -38,6 +43,6 @@ class Job(Base):
     output_video = Column(String(500), nullable=True)
     error = Column(Text, nullable=True)
     
-    # Timestamps
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # Timestamps (naive UTC)
+    created_at = Column(DateTime, server_default=UTC_NOW, nullable=False)
+    updated_at = Column(DateTime, server_default=UTC_NOW, nullable=False)
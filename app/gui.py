@@ -5,6 +5,8 @@ Fred Gradio GUI - Simple interface for face reenactment + voice conversion.
 Run with: python app/gui.py
 """
 
+import asyncio
+import functools
 import os
 import subprocess
 import sys
@@ -15,22 +17,19 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import gradio as gr
 
-# Configuration - paths relative to project root by default
-PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-SHARED_DATA_PATH = os.getenv(
-    "SHARED_DATA_PATH", os.path.join(PROJECT_ROOT, "shared_data")
-)
-IDENTITIES_PATH = os.getenv("IDENTITIES_PATH", os.path.join(PROJECT_ROOT, "identities"))
-XNEMO_REPO_PATH = os.getenv(
-    "XNEMO_REPO_PATH", os.path.join(PROJECT_ROOT, "tools", "x-nemo-inference")
-)
-XNEMO_WEIGHTS_PATH = os.getenv(
-    "XNEMO_WEIGHTS_PATH", os.path.join(XNEMO_REPO_PATH, "pretrained_weights")
-)
-SEEDVC_REPO_PATH = os.getenv(
-    "SEEDVC_REPO_PATH", os.path.join(PROJECT_ROOT, "tools", "seed-vc")
+from app.paths import (
+    IDENTITIES_PATH,
+    OUTPUT_PATH,
+    SEEDVC_REPO_PATH,
+    SHARED_DATA_PATH,
+    TEMP_PATH,
+    UPLOADS_PATH,
+    XNEMO_REPO_PATH,
+    XNEMO_WEIGHTS_PATH,
 )
+
 DEVICE = os.getenv("DEVICE", "cuda")
+PERSISTENT_MODELS = os.getenv("PERSISTENT_MODELS", "0") == "1"
 
 # Import identity management
 from app.core.identities import (
@@ -91,10 +90,60 @@ def update_image_preview(identity_id: str, image_name: str):
     return None
 
 
-def extract_audio(video_path: str, audio_path: str):
-    """Extract audio from video using ffmpeg."""
-    cmd = [
+@functools.lru_cache(maxsize=None)
+def get_xnemo_runner():
+    """X-Nemo runner shared by all requests for the lifetime of the GUI."""
+    from app.workers.gpu import default_dtype
+    from app.workers.xnemo_runner import XNemoRunner
+
+    return XNemoRunner(
+        pretrained_weights_path=XNEMO_WEIGHTS_PATH,
+        device=DEVICE,
+        dtype=default_dtype(DEVICE),
+        verbose=True,
+        persistent=PERSISTENT_MODELS,
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_seedvc_runner():
+    """Seed-VC runner shared by all requests for the lifetime of the GUI."""
+    from app.workers.gpu import default_dtype
+    from app.workers.seedvc_runner import SeedVCRunner
+
+    return SeedVCRunner(
+        device=DEVICE,
+        dtype=default_dtype(DEVICE),
+        compile_model=False,
+        verbose=True,
+        persistent=PERSISTENT_MODELS,
+    )
+
+
+async def run_ffmpeg(args: list, error_message: str):
+    """Run ffmpeg without blocking the event loop.
+
+    Only errors are logged and progress stats are disabled, so the captured
+    stderr stays small; it is decoded only if ffmpeg fails.
+    """
+    proc = await asyncio.create_subprocess_exec(
         "ffmpeg",
+        "-hide_banner",
+        "-nostats",
+        "-loglevel",
+        "error",
+        *args,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    _, stderr = await proc.communicate()
+    if proc.returncode != 0:
+        raise RuntimeError(f"{error_message}: {stderr.decode(errors='replace')}")
+
+
+async def extract_audio(video_path: str, audio_path: str):
+    """Extract audio from video using ffmpeg."""
+    args = [
         "-y",
         "-i",
         video_path,
@@ -107,32 +156,86 @@ def extract_audio(video_path: str, audio_path: str):
         "1",
         audio_path,
     ]
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    if result.returncode != 0:
-        raise RuntimeError(f"FFmpeg audio extraction failed: {result.stderr}")
+    await run_ffmpeg(args, "FFmpeg audio extraction failed")
+
+
+@functools.lru_cache(maxsize=None)
+def nvenc_available() -> bool:
+    """Check (once) whether we can encode on the GPU with NVENC."""
+    if DEVICE != "cuda":
+        return False
+    try:
+        result = subprocess.run(
+            ["ffmpeg", "-hide_banner", "-encoders"],
+            capture_output=True,
+            text=True,
+        )
+    except OSError:
+        return False
+    return result.returncode == 0 and "h264_nvenc" in result.stdout
 
 
-def combine_video_audio(video_path: str, audio_path: str, output_path: str):
+async def combine_video_audio(video_path: str, audio_path: str, output_path: str):
     """Combine video and audio using ffmpeg with web-compatible codecs.
 
     We don't touch FPS at all – we just re-encode the X-Nemo video to a
     browser‑friendly H.264 variant and mux in the converted audio.
+    On CUDA machines decode and encode stay on the GPU (NVDEC/NVENC);
+    otherwise, or if the NVENC run fails (e.g. the GPU is out of encoder
+    sessions), libx264 is used with a fast preset on all cores.
     """
-    cmd = [
-        "ffmpeg",
+    if nvenc_available():
+        try:
+            await _combine_video_audio(video_path, audio_path, output_path, True)
+            return
+        except RuntimeError as e:
+            print(f"NVENC encode failed, retrying with libx264: {e}")
+    await _combine_video_audio(video_path, audio_path, output_path, False)
+
+
+async def _combine_video_audio(
+    video_path: str, audio_path: str, output_path: str, nvenc: bool
+):
+    """Run the ffmpeg combine with either NVENC or libx264."""
+    if nvenc:
+        video_input = ["-hwaccel", "cuda", "-hwaccel_output_format", "cuda"]
+        video_codec = [
+            "-c:v",
+            "h264_nvenc",
+            "-preset",
+            "p4",
+            "-tune",
+            "hq",
+            "-rc",
+            "vbr",
+            "-cq",
+            "23",
+            "-b:v",
+            "0",
+        ]
+    else:
+        video_input = []
+        video_codec = [
+            "-c:v",
+            "libx264",
+            "-preset",
+            "veryfast",
+            "-threads",
+            "0",
+            "-crf",
+            "23",
+            "-pix_fmt",
+            "yuv420p",
+        ]
+
+    args = [
         "-y",
+        *video_input,
         "-i",
         video_path,
         "-i",
         audio_path,
-        "-c:v",
-        "libx264",
-        "-preset",
-        "medium",
-        "-crf",
-        "23",
-        "-pix_fmt",
-        "yuv420p",
+        *video_codec,
         "-c:a",
         "aac",
         "-b:a",
@@ -144,12 +247,10 @@ def combine_video_audio(video_path: str, audio_path: str, output_path: str):
         "-shortest",
         output_path,
     ]
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    if result.returncode != 0:
-        raise RuntimeError(f"FFmpeg combine failed: {result.stderr}")
+    await run_ffmpeg(args, "FFmpeg combine failed")
 
 
-def process_video(
+async def process_video(
     identity_id: str,
     image_name: str,
     video_file,
@@ -182,31 +283,23 @@ def process_video(
 
     # Create job ID and paths
     job_id = str(uuid.uuid4())[:8]
-    temp_dir = os.path.join(SHARED_DATA_PATH, "temp")
-    output_dir = os.path.join(SHARED_DATA_PATH, "output")
-    os.makedirs(temp_dir, exist_ok=True)
-    os.makedirs(output_dir, exist_ok=True)
 
     user_video_path = video_file
-    xnemo_output = os.path.join(temp_dir, f"{job_id}_xnemo.mp4")
-    user_audio = os.path.join(temp_dir, f"{job_id}_user_audio.wav")
-    converted_audio = os.path.join(temp_dir, f"{job_id}_converted.wav")
-    final_output = os.path.join(output_dir, f"{job_id}_final.mp4")
+    xnemo_output = os.path.join(TEMP_PATH, f"{job_id}_xnemo.mp4")
+    user_audio = os.path.join(TEMP_PATH, f"{job_id}_user_audio.wav")
+    converted_audio = os.path.join(TEMP_PATH, f"{job_id}_converted.wav")
+    final_output = os.path.join(OUTPUT_PATH, f"{job_id}_final.mp4")
+
+    # Audio extraction only depends on the user video, so run it (CPU-bound
+    # ffmpeg) alongside X-Nemo (GPU) instead of as a separate step after it
+    audio_task = asyncio.create_task(extract_audio(user_video_path, user_audio))
 
     try:
-        # Step 1: Run X-Nemo (Face Reenactment)
+        # Step 1: Run X-Nemo (Face Reenactment) + extract audio from user video
         progress(0.1, desc="Running X-Nemo (face reenactment)...")
 
-        from app.workers.xnemo_runner import XNemoRunner
-
-        xnemo_runner = XNemoRunner(
-            pretrained_weights_path=XNEMO_WEIGHTS_PATH,
-            device=DEVICE,
-            dtype="fp16",
-            verbose=True,
-        )
-
-        xnemo_runner.generate(
+        await asyncio.to_thread(
+            get_xnemo_runner().generate,
             source_video=user_video_path,
             identity_image=identity_image_path,
             output_path=xnemo_output,
@@ -214,24 +307,13 @@ def process_video(
             guidance_scale=2.5,
         )
 
-        progress(0.5, desc="X-Nemo complete. Extracting audio...")
-
-        # Step 2: Extract audio from user video
-        extract_audio(user_video_path, user_audio)
+        await audio_task
 
         progress(0.55, desc="Running Seed-VC (voice conversion)...")
 
-        # Step 3: Run Seed-VC (Voice Conversion)
-        from app.workers.seedvc_runner import SeedVCRunner
-
-        seedvc_runner = SeedVCRunner(
-            device=DEVICE,
-            dtype="fp16",
-            compile_model=False,
-            verbose=True,
-        )
-
-        seedvc_runner.convert(
+        # Step 2: Run Seed-VC (Voice Conversion)
+        await asyncio.to_thread(
+            get_seedvc_runner().convert,
             source_audio=user_audio,
             reference_audio=identity_audio_path,
             output_path=converted_audio,
@@ -242,8 +324,8 @@ def process_video(
 
         progress(0.9, desc="Seed-VC complete. Combining video and audio...")
 
-        # Step 4: Combine video + audio
-        combine_video_audio(xnemo_output, converted_audio, final_output)
+        # Step 3: Combine video + audio
+        await combine_video_audio(xnemo_output, converted_audio, final_output)
 
         progress(1.0, desc="Done!")
 
@@ -257,6 +339,8 @@ def process_video(
         return final_output
 
     except Exception as e:
+        if not audio_task.done():
+            audio_task.cancel()
         # Keep temp files on error as well for debugging.
         raise gr.Error(f"Processing failed: {str(e)}")
 
@@ -389,8 +473,8 @@ def main():
     print("=" * 60)
 
     # Create required directories
-    for subdir in ["uploads", "temp", "output"]:
-        os.makedirs(os.path.join(SHARED_DATA_PATH, subdir), exist_ok=True)
+    for path in [UPLOADS_PATH, TEMP_PATH, OUTPUT_PATH]:
+        os.makedirs(path, exist_ok=True)
 
     # Verify setup
     errors = []
@@ -5,18 +5,13 @@ Fred MVP - Video generation with identity reenactment + voice conversion.
 import os
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import FileResponse
 
 from app.api import router
 from app.db import init_db
-
-# Configuration - paths relative to project root by default
-PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-SHARED_DATA_PATH = os.getenv(
-    "SHARED_DATA_PATH", os.path.join(PROJECT_ROOT, "shared_data")
-)
+from app.paths import OUTPUT_PATH, UPLOADS_PATH
 
 
 @asynccontextmanager
@@ -36,12 +31,31 @@ app.add_middleware(
 
 app.include_router(router)
 
-# Serve output videos
-output_dir = os.path.join(SHARED_DATA_PATH, "output")
-os.makedirs(output_dir, exist_ok=True)
-app.mount("/output", StaticFiles(directory=output_dir), name="output")
+# Create shared data directories once, so request handlers don't have to
+for _path in (UPLOADS_PATH, OUTPUT_PATH):
+    os.makedirs(_path, exist_ok=True)
+
+
+@app.get("/output/{filename}")
+def get_output(filename: str):
+    """Stream a generated video (sendfile when available, supports Range)."""
+    # Only plain filenames - no path traversal out of the output directory
+    if filename != os.path.basename(filename) or filename.startswith("."):
+        raise HTTPException(status_code=404, detail="Output not found")
+    path = os.path.join(OUTPUT_PATH, filename)
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Output not found")
+    return FileResponse(path, media_type="video/mp4")
 
 
 @app.get("/health")
 def health():
     return {"status": "ok"}
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(
+        "app.main:app", host="0.0.0.0", port=8000, loop="uvloop", http="httptools"
+    )
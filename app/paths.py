@@ -0,0 +1,37 @@
+"""
+Filesystem locations used across Fred, resolved once at import.
+
+Paths are relative to the project root by default and can be overridden
+with environment variables.
+"""
+
+import os
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SHARED_DATA_PATH = os.getenv(
+    "SHARED_DATA_PATH", os.path.join(PROJECT_ROOT, "shared_data")
+)
+IDENTITIES_PATH = os.getenv("IDENTITIES_PATH", os.path.join(PROJECT_ROOT, "identities"))
+XNEMO_REPO_PATH = os.getenv(
+    "XNEMO_REPO_PATH", os.path.join(PROJECT_ROOT, "tools", "x-nemo-inference")
+)
+XNEMO_WEIGHTS_PATH = os.getenv(
+    "XNEMO_WEIGHTS_PATH", os.path.join(XNEMO_REPO_PATH, "pretrained_weights")
+)
+SEEDVC_REPO_PATH = os.getenv(
+    "SEEDVC_REPO_PATH", os.path.join(PROJECT_ROOT, "tools", "seed-vc")
+)
+EMBEDDING_CACHE_PATH = os.getenv(
+    "EMBEDDING_CACHE_PATH", os.path.join(SHARED_DATA_PATH, "identity_cache")
+)
+# Short-lived per-job intermediates; tmpfs keeps them off the disk
+SCRATCH_PATH = os.getenv(
+    "SCRATCH_PATH",
+    "/dev/shm" if os.path.isdir("/dev/shm") else os.path.join(SHARED_DATA_PATH, "temp"),
+)
+
+# Shared data subdirectories (created at worker/API startup)
+UPLOADS_PATH = os.path.join(SHARED_DATA_PATH, "uploads")
+TEMP_PATH = os.path.join(SHARED_DATA_PATH, "temp")
+OUTPUT_PATH = os.path.join(SHARED_DATA_PATH, "output")
@@ -1,3 +1,4 @@
+from app.schemas.identity import IdentityDetail, IdentitySummary
 from app.schemas.job import JobCreate, JobResponse, JobProgress
 
-__all__ = ["JobCreate", "JobResponse", "JobProgress"]
+__all__ = ["IdentityDetail", "IdentitySummary", "JobCreate", "JobResponse", "JobProgress"]
@@ -0,0 +1,18 @@
+"""
+Pydantic schemas for identity endpoints.
+"""
+from typing import List
+
+from pydantic import BaseModel
+
+
+class IdentitySummary(BaseModel):
+    """Identity as listed for selection."""
+    id: str
+    name: str
+    images: List[str]
+
+
+class IdentityDetail(IdentitySummary):
+    """Single identity, including its reference audio."""
+    audio: str
@@ -1,12 +1,24 @@
 # Workers for processing jobs
 
-from app.workers.seedvc_runner import SeedVCRunner, get_seedvc_runner, run_seedvc
-from app.workers.xnemo_runner import XNemoRunner, get_xnemo_runner, run_xnemo
+from app.workers.seedvc_runner import (
+    SeedVCDaemon,
+    SeedVCRunner,
+    get_seedvc_runner,
+    run_seedvc,
+)
+from app.workers.xnemo_runner import (
+    XNemoDaemon,
+    XNemoRunner,
+    get_xnemo_runner,
+    run_xnemo,
+)
 
 __all__ = [
+    "XNemoDaemon",
     "XNemoRunner",
     "get_xnemo_runner",
     "run_xnemo",
+    "SeedVCDaemon",
     "SeedVCRunner",
     "get_seedvc_runner",
     "run_seedvc",
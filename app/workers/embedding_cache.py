@@ -0,0 +1,115 @@
+"""
+Embedding Cache - Reference embeddings shared across jobs.
+
+Identities are reused across many jobs, and both models start by running
+their reference encoder on the identity's face image / voice sample. The
+runners pass ``--reference-embedding <path>`` to the scripts, which load
+the FP16 array if the file exists and otherwise compute it and save it
+there (``np.save(path, emb.detach().half().cpu().numpy())``).
+
+Files are keyed by the reference file's content hash and a model tag built
+by weights_tag() from the size/mtime of the model's checkpoint files, so
+replacing an identity's files or upgrading a model's weights never serves a
+stale embedding. Runners build their tag once at startup, matching the
+weights they load. Whenever a new embedding is about to be written the cache
+is trimmed to EMBEDDING_CACHE_MAX_BYTES, dropping the least recently used
+(by atime) files first.
+"""
+
+import functools
+import hashlib
+import logging
+import os
+
+from app.paths import EMBEDDING_CACHE_PATH
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_CACHE = os.getenv("EMBEDDING_CACHE", "1") == "1"
+EMBEDDING_CACHE_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", 10 << 30))
+
+
+@functools.lru_cache(maxsize=1024)
+def _file_digest(path: str, mtime_ns: int, size: int) -> str:
+    """sha1 of a file's contents (memoized per path/mtime/size)."""
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def weights_tag(model: str, *weight_paths: str) -> str:
+    """
+    Model tag identifying the weights a model loads.
+
+    Args:
+        model: Model name
+        weight_paths: Checkpoint files or directories (walked recursively);
+            missing paths are skipped
+
+    Returns:
+        "<model>:<sha1 of every checkpoint file's path, size and mtime>"
+    """
+    h = hashlib.sha1()
+    for root in weight_paths:
+        if os.path.isfile(root):
+            files = [root]
+        else:
+            files = sorted(
+                os.path.join(dirpath, name)
+                for dirpath, _, names in os.walk(root)
+                for name in names
+            )
+        for path in files:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            h.update(f"{path}:{st.st_size}:{st.st_mtime_ns};".encode())
+    return f"{model}:{h.hexdigest()}"
+
+
+def evict(max_bytes: int = EMBEDDING_CACHE_MAX_BYTES):
+    """Delete least recently used embeddings until the cache fits max_bytes."""
+    if not os.path.isdir(EMBEDDING_CACHE_PATH):
+        return
+    with os.scandir(EMBEDDING_CACHE_PATH) as it:
+        entries = [
+            (st.st_atime, st.st_size, entry.path)
+            for entry in it
+            if entry.is_file() and (st := entry.stat())
+        ]
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+
+def embedding_path(reference_path: str, model: str, kind: str) -> str:
+    """
+    Cache file for the embedding of a reference file.
+
+    Args:
+        reference_path: Face image or voice sample
+        model: Model tag from weights_tag()
+        kind: "face" or "voice"
+
+    Returns:
+        Path to pass as --reference-embedding (may not exist yet)
+    """
+    st = os.stat(reference_path)
+    digest = _file_digest(reference_path, st.st_mtime_ns, st.st_size)
+    key = hashlib.sha1(f"{digest}:{model}".encode()).hexdigest()
+
+    os.makedirs(EMBEDDING_CACHE_PATH, exist_ok=True)
+    path = os.path.join(EMBEDDING_CACHE_PATH, f"{key}.{kind}.fp16.npy")
+    if not os.path.exists(path):
+        # The script is about to insert this file; make room for it
+        evict()
+    return path
@@ -0,0 +1,61 @@
+"""
+File I/O helpers for large job artifacts.
+
+Job inputs and intermediates (uploaded videos, extracted WAVs, X-Nemo
+output) are hundreds of MB and may live on network storage. These helpers
+keep the data in the kernel where possible:
+
+- prefetch() asks the kernel to start reading files in the background
+  (posix_fadvise WILLNEED), so disk/NFS latency overlaps with model work.
+- copy_file() copies with copy_file_range(), which moves data kernel-side
+  (or server-side on NFS 4.2) without a round-trip through user space.
+
+Both fall back to plain stdlib behaviour where the syscalls are missing.
+"""
+
+import logging
+import os
+import shutil
+
+logger = logging.getLogger(__name__)
+
+# copy_file_range() chunk size - large enough to keep syscall count low
+COPY_CHUNK_SIZE = 64 << 20
+
+
+def prefetch(*paths: str):
+    """Hint the kernel to read the given files ahead of use (best effort)."""
+    if not hasattr(os, "posix_fadvise"):
+        return
+    for path in paths:
+        if not path:
+            continue
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        except OSError as e:
+            logger.debug(f"posix_fadvise failed for {path}: {e}")
+        finally:
+            os.close(fd)
+
+
+def copy_file(src: str, dst: str):
+    """Copy src to dst, using copy_file_range() when the kernel supports it."""
+    if not hasattr(os, "copy_file_range"):
+        shutil.copyfile(src, dst)
+        return
+
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        try:
+            while os.copy_file_range(fsrc.fileno(), fdst.fileno(), COPY_CHUNK_SIZE):
+                pass
+            return
+        except OSError:
+            # EXDEV/ENOSYS/EINVAL on older kernels or unsupported filesystems
+            fsrc.seek(0)
+            fdst.seek(0)
+            fdst.truncate()
+        shutil.copyfileobj(fsrc, fdst, COPY_CHUNK_SIZE)
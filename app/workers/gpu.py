@@ -0,0 +1,96 @@
+"""
+GPU helpers shared by the worker and the GUI.
+"""
+
+import functools
+import logging
+import os
+import subprocess
+import time
+
+logger = logging.getLogger(__name__)
+
+# Environment for model subprocesses. Expandable segments let the caching
+# allocator grow and shrink mappings instead of fragmenting into fixed
+# blocks, which matters when two models share a GPU; lazy module loading
+# skips loading kernels that are never used. Unbuffered output also covers
+# grandchildren the runner scripts may spawn.
+GPU_ENV = {
+    "PYTORCH_CUDA_ALLOC_CONF": "expandable_segments:True,max_split_size_mb:128",
+    "CUDA_MODULE_LOADING": "LAZY",
+    "PYTHONUNBUFFERED": "1",
+}
+
+
+def gpu_env() -> dict:
+    """Current environment with GPU_ENV applied (explicit settings win)."""
+    return {**GPU_ENV, **os.environ}
+
+
+def retry_on_oom(max_retries: int = 3, retry_delay: int = 30):
+    """
+    Retry a model call that failed with CUDA out of memory.
+
+    Memory held by another process (e.g. the other model in parallel mode)
+    is usually released within seconds, so waiting and retrying beats
+    failing the job.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            for attempt in range(max_retries + 1):
+                try:
+                    return func(*args, **kwargs)
+                except RuntimeError as e:
+                    if "out of memory" not in str(e).lower() or attempt == max_retries:
+                        raise
+                    logger.warning(
+                        f"{func.__name__} ran out of GPU memory "
+                        f"(attempt {attempt + 1}/{max_retries + 1}), "
+                        f"retrying in {retry_delay}s"
+                    )
+                    time.sleep(retry_delay)
+
+        return wrapper
+
+    return decorator
+
+
+@functools.lru_cache(maxsize=None)
+def compute_capability() -> tuple:
+    """Compute capability of GPU 0 as (major, minor), or (0, 0) if unknown.
+
+    Queried through nvidia-smi so the worker doesn't have to import torch.
+    """
+    try:
+        result = subprocess.run(
+            ["nvidia-smi", "--query-gpu=compute_cap", "--format=csv,noheader"],
+            capture_output=True,
+            text=True,
+            timeout=10,
+        )
+        major, minor = result.stdout.splitlines()[0].strip().split(".")
+        return int(major), int(minor)
+    except (OSError, subprocess.TimeoutExpired, IndexError, ValueError):
+        return (0, 0)
+
+
+@functools.lru_cache(maxsize=None)
+def default_dtype(device: str = "cuda") -> str:
+    """
+    Inference dtype for the models.
+
+    DTYPE overrides the detection. Otherwise bf16 on Ampere or newer (same
+    throughput as fp16, wider range, no overflow risk), fp16 on older GPUs.
+    The result is exported as DTYPE so child processes see the same choice.
+    """
+    dtype = os.getenv("DTYPE")
+    if not dtype:
+        if device == "cuda" and compute_capability() >= (8, 0):
+            dtype = "bf16"
+        else:
+            dtype = "fp16"
+        os.environ["DTYPE"] = dtype
+    logger.info(f"Using dtype {dtype}")
+    return dtype
@@ -0,0 +1,166 @@
+"""
+GPU Monitor - Tracks free VRAM so jobs wait for memory instead of crashing.
+
+A background thread polls nvidia-smi. Memory held by the worker's own child
+processes (the model daemons, whose CUDA caching allocators keep VRAM between
+jobs, and one-shot runner scripts) is tracked separately from the rest, so
+it counts as available to the worker's next job instead of blocking it.
+Before a job is dispatched the worker waits until free memory plus what its
+own processes hold covers what recent jobs needed at their peak; afterwards
+it records what this job's processes actually took.
+
+If nvidia-smi is unavailable the monitor stays disabled and never blocks.
+"""
+
+import collections
+import logging
+import os
+import subprocess
+import threading
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _is_descendant(pid: int, ancestor: int) -> bool:
+    """Whether pid is a (transitive) child of ancestor, going by /proc."""
+    while pid > 1:
+        if pid == ancestor:
+            return True
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                # The command name may contain spaces; ppid follows its ")"
+                pid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            return False
+    return False
+
+
+class GPUMonitor:
+    """Polls free memory of one GPU and tracks our own processes' peak usage."""
+
+    def __init__(self, poll_interval: float = 0.5, gpu_index: int = 0):
+        self.poll_interval = poll_interval
+        self.gpu_index = gpu_index
+        self.free_mb: Optional[int] = None
+        self.own_used_mb = 0
+        self.peak_own_mb = 0
+        self._cond = threading.Condition()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.free_mb is not None
+
+    def _nvidia_smi(self, query: str) -> list:
+        """Rows of an nvidia-smi CSV query, split into fields."""
+        result = subprocess.run(
+            [
+                "nvidia-smi",
+                f"--id={self.gpu_index}",
+                query,
+                "--format=csv,noheader,nounits",
+            ],
+            capture_output=True,
+            text=True,
+            timeout=10,
+        )
+        return [
+            [field.strip() for field in line.split(",")]
+            for line in result.stdout.splitlines()
+            if line.strip()
+        ]
+
+    def _query(self) -> Optional[tuple]:
+        """(free MiB, MiB used by processes descended from this one)."""
+        try:
+            (free,) = self._nvidia_smi("--query-gpu=memory.free")[0]
+            apps = self._nvidia_smi("--query-compute-apps=pid,used_memory")
+        except (OSError, subprocess.TimeoutExpired, ValueError, IndexError):
+            return None
+        me = os.getpid()
+        own = 0
+        for app in apps:
+            try:
+                pid, used = int(app[0]), int(app[1])
+            except (IndexError, ValueError):
+                continue
+            if _is_descendant(pid, me):
+                own += used
+        return int(free), own
+
+    def _poll(self):
+        while not self._stopped.wait(self.poll_interval):
+            sample = self._query()
+            if sample is None:
+                continue
+            with self._cond:
+                self.free_mb, self.own_used_mb = sample
+                self.peak_own_mb = max(self.peak_own_mb, self.own_used_mb)
+                self._cond.notify_all()
+
+    def start(self) -> bool:
+        """Start polling. Returns False (and stays disabled) without nvidia-smi."""
+        sample = self._query()
+        if sample is None:
+            logger.warning("nvidia-smi unavailable, GPU memory monitoring disabled")
+            return False
+        self.free_mb, self.own_used_mb = sample
+        self.peak_own_mb = self.own_used_mb
+        self._thread = threading.Thread(target=self._poll, daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        self._stopped.set()
+
+    def reset_peak(self):
+        """Start a new peak measurement from our processes' current usage."""
+        with self._cond:
+            self.peak_own_mb = self.own_used_mb
+
+    def wait_for(self, need_mb: int, timeout: float = 300) -> bool:
+        """
+        Block until a job needing need_mb MiB fits. Returns False on timeout.
+
+        Memory our own processes already hold counts toward need_mb, so
+        resident model daemons never make the worker wait for itself.
+        """
+        if not self.enabled or need_mb <= 0:
+            return True
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self.free_mb + self.own_used_mb < need_mb:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+
+class ResourceEstimator:
+    """
+    Estimates a job's VRAM need from the peaks of recent jobs.
+
+    Peaks are the total held by the worker's own processes, models included,
+    so they don't depend on whether the models were already loaded.
+
+    Jobs here vary mostly in clip length, so the largest recent peak plus a
+    safety margin is a good enough bound.
+    """
+
+    def __init__(self, default_mb: int = 0, history: int = 20, margin: float = 1.1):
+        self.default_mb = default_mb
+        self.margin = margin
+        self._peaks = collections.deque(maxlen=history)
+
+    def record(self, peak_mb: int):
+        if peak_mb > 0:
+            self._peaks.append(peak_mb)
+
+    def estimate(self) -> int:
+        if not self._peaks:
+            return self.default_mb
+        return int(max(self._peaks) * self.margin)
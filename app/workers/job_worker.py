@@ -11,24 +11,55 @@ Environment Variables:
     XNEMO_REPO_PATH: Path to x-nemo-inference repo (default: /home/samariva/tools/x-nemo-inference)
     XNEMO_WEIGHTS_PATH: Path to X-Nemo pretrained weights (default: XNEMO_REPO_PATH/pretrained_weights)
     SEEDVC_REPO_PATH: Path to seed-vc repo (default: /home/samariva/tools/seed-vc)
-    EXECUTION_MODE: "sequential" or "parallel" (default: sequential for GPU safety)
+    EXECUTION_MODE: "sequential", "parallel" or "parallel_mps" (parallel with
+        both models sharing the GPU through NVIDIA MPS) (default: sequential for GPU safety)
+    MPS_THREAD_PERCENTAGE: SM share per model in parallel_mps mode (default: 50)
+    PERSISTENT_MODELS: "1" keeps both models loaded between jobs in daemon
+        subprocesses (needs VRAM for both at once), "0" starts them per job (default: 0)
+    WORKER_BATCH: Pending jobs claimed per queue query; claimed jobs show as
+        processing until the whole batch is done (default: 1)
+    GPU_JOB_MEM_MB: VRAM (MiB) a job needs until one has been measured (default: 0)
     DEVICE: cuda/cpu (default: cuda)
+    DTYPE: fp16/bf16/fp32 (default: bf16 on Ampere or newer, else fp16)
+    SEEDVC_COMPILE: "1" runs Seed-VC through torch.compile (default: 1)
+    FFMPEG_FAST_PATH: "1" skips ffmpeg work when inputs are already in the
+        target format (default: 1)
     PYTHON_EXECUTABLE: Python interpreter to use (default: python)
 """
 
+import asyncio
+import atexit
+import functools
+import json
 import logging
 import os
+import select
 import subprocess
 import sys
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, List, Optional
 
-sys.path.insert(
-    0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-)
+import psycopg2
+from sqlalchemy import update
+from sqlalchemy.orm import Session
 
 from app.core import get_identity_audio_path, get_identity_image_path
-from app.db import Job, JobStatus, SessionLocal
+from app.db import JOB_PENDING_CHANNEL, LISTEN_DSN, Job, JobStatus, SessionLocal
+from app.paths import (
+    OUTPUT_PATH,
+    SCRATCH_PATH,
+    SEEDVC_REPO_PATH,
+    SHARED_DATA_PATH,
+    TEMP_PATH,
+    UPLOADS_PATH,
+    XNEMO_REPO_PATH,
+    XNEMO_WEIGHTS_PATH,
+)
+from app.workers.file_io import copy_file, prefetch
+from app.workers.gpu import default_dtype, retry_on_oom
+from app.workers.gpu_monitor import GPUMonitor, ResourceEstimator
+from app.workers.progress_flusher import ProgressFlusher
+from app.workers.runner_daemon import run_streaming
 from app.workers.seedvc_runner import SeedVCRunner
 from app.workers.xnemo_runner import XNemoRunner
 
@@ -37,50 +68,122 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Configuration - paths relative to project root by default
-PROJECT_ROOT = os.path.dirname(
-    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-)
-SHARED_DATA_PATH = os.getenv(
-    "SHARED_DATA_PATH", os.path.join(PROJECT_ROOT, "shared_data")
-)
-XNEMO_REPO_PATH = os.getenv(
-    "XNEMO_REPO_PATH", os.path.join(PROJECT_ROOT, "tools", "x-nemo-inference")
-)
-XNEMO_WEIGHTS_PATH = os.getenv(
-    "XNEMO_WEIGHTS_PATH", os.path.join(XNEMO_REPO_PATH, "pretrained_weights")
-)
-SEEDVC_REPO_PATH = os.getenv(
-    "SEEDVC_REPO_PATH", os.path.join(PROJECT_ROOT, "tools", "seed-vc")
-)
-EXECUTION_MODE = os.getenv("EXECUTION_MODE", "sequential")  # "sequential" or "parallel"
+EXECUTION_MODE = os.getenv("EXECUTION_MODE", "sequential")  # see module docstring
+MPS_THREAD_PERCENTAGE = os.getenv("MPS_THREAD_PERCENTAGE", "50")
 DEVICE = os.getenv("DEVICE", "cuda")
-POLL_INTERVAL = 2
+PERSISTENT_MODELS = os.getenv("PERSISTENT_MODELS", "0") == "1"
+SEEDVC_COMPILE = os.getenv("SEEDVC_COMPILE", "1") == "1"
+WORKER_BATCH = int(os.getenv("WORKER_BATCH", "1"))
+# VRAM (MiB) a job needs before the first one is measured; later jobs use
+# the measured peaks of our own processes
+GPU_JOB_MEM_MB = int(os.getenv("GPU_JOB_MEM_MB", "0"))
+GPU_WAIT_TIMEOUT = 300
+
+FFMPEG_FAST_PATH = os.getenv("FFMPEG_FAST_PATH", "1") == "1"
+
+# Minimum progress change (percent) worth a database write from live updates
+PROGRESS_STEP = 5
+
+# Safety net: re-check the queue this often even without a notification
+LISTEN_TIMEOUT = 30
+ERROR_BACKOFF = 5
+
+
+# Progress writes are batched on a background thread (see ProgressFlusher)
+PROGRESS_FLUSHER = ProgressFlusher()
+
+
+def _update_job(db: Session, job_id, **fields):
+    """Write job fields with a single UPDATE (no SELECT) and commit."""
+    db.execute(update(Job).where(Job.id == job_id).values(**fields))
+    db.commit()
+
+
+def update_progress(job_id, progress: int):
+    """Queue a job progress update (written in the flusher's next batch).
+
+    Values below what the job already reported are ignored, so progress
+    never goes backwards when both models report at once.
+    """
+    PROGRESS_FLUSHER.put(job_id, progress)
 
 
-def update_progress(job_id, progress: int, status: JobStatus = None):
-    """Update job progress in database."""
-    db = SessionLocal()
+def progress_reporter(job_id, start: int, end: int) -> Callable[[float], None]:
+    """Map a runner's 0-100% progress onto the job's [start, end] range.
+
+    Changes smaller than PROGRESS_STEP are not written.
+    """
+    last = [start]
+
+    def report(pct: float):
+        progress = start + int((end - start) * min(pct, 100) / 100)
+        if progress - last[0] >= PROGRESS_STEP:
+            last[0] = progress
+            update_progress(job_id, progress)
+
+    return report
+
+
+def _probe(path: str) -> dict:
+    """Return ffprobe's format and stream info for a media file ({} on failure)."""
+    cmd = [
+        "ffprobe",
+        "-v",
+        "quiet",
+        "-print_format",
+        "json",
+        "-show_format",
+        "-show_streams",
+        path,
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        return {}
+    return json.loads(result.stdout)
+
+
+def _audio_streams(info: dict) -> list:
+    return [s for s in info.get("streams", []) if s.get("codec_type") == "audio"]
+
+
+def _link_or_copy(src: str, dst: str):
+    """Hardlink src to dst, copying instead when they are on different filesystems."""
+    if os.path.exists(dst):
+        os.remove(dst)
     try:
-        job = db.query(Job).filter(Job.id == job_id).first()
-        if job:
-            job.progress = progress
-            if status:
-                job.status = status
-            db.commit()
-    finally:
-        db.close()
+        os.link(src, dst)
+    except OSError:
+        copy_file(src, dst)
 
 
 def extract_audio(video_path: str, audio_path: str):
     """Extract audio from video using ffmpeg at 22050Hz (Seed-VC sample rate)."""
     os.makedirs(os.path.dirname(audio_path), exist_ok=True)
+
+    # Uploads are normally videos; only spend an ffprobe on ones named .wav
+    if FFMPEG_FAST_PATH and video_path.lower().endswith(".wav"):
+        # Already a 22050Hz mono 16-bit WAV - nothing to convert
+        info = _probe(video_path)
+        streams = info.get("streams", [])
+        if (
+            "wav" in info.get("format", {}).get("format_name", "").split(",")
+            and len(streams) == 1
+            and streams[0].get("codec_name") == "pcm_s16le"
+            and streams[0].get("sample_rate") == "22050"
+            and streams[0].get("channels") == 1
+        ):
+            _link_or_copy(video_path, audio_path)
+            logger.info(f"Linked audio to {audio_path} (already in target format)")
+            return
+
     cmd = [
         "ffmpeg",
         "-y",
         "-i",
         video_path,
         "-vn",
+        "-threads",
+        "0",
         "-acodec",
         "pcm_s16le",
         "-ar",
@@ -89,13 +192,41 @@ def extract_audio(video_path: str, audio_path: str):
         "1",
         audio_path,
     ]
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    if result.returncode != 0:
-        raise RuntimeError(f"FFmpeg audio extraction failed: {result.stderr}")
+    run_streaming(cmd, name="FFmpeg audio extraction")
     logger.info(f"Extracted audio to {audio_path}")
 
 
-def run_xnemo_task(job_id: str, user_video_path: str, identity_image_path: str) -> str:
+@functools.lru_cache(maxsize=None)
+def get_xnemo_runner() -> XNemoRunner:
+    """X-Nemo runner shared by all jobs in this worker."""
+    return XNemoRunner(
+        pretrained_weights_path=XNEMO_WEIGHTS_PATH,
+        device=DEVICE,
+        dtype=default_dtype(DEVICE),
+        verbose=True,
+        persistent=PERSISTENT_MODELS,
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_seedvc_runner() -> SeedVCRunner:
+    """Seed-VC runner shared by all jobs in this worker."""
+    return SeedVCRunner(
+        device=DEVICE,
+        dtype=default_dtype(DEVICE),
+        compile_model=SEEDVC_COMPILE,
+        verbose=True,
+        persistent=PERSISTENT_MODELS,
+    )
+
+
+@retry_on_oom()
+def run_xnemo_task(
+    job_id: str,
+    user_video_path: str,
+    identity_image_path: str,
+    progress_cb: Optional[Callable[[float], None]] = None,
+) -> str:
     """
     Run X-Nemo: user_video (motion source) + identity_image (face) -> reenacted video.
 
@@ -107,61 +238,69 @@ def run_xnemo_task(job_id: str, user_video_path: str, identity_image_path: str)
     logger.info(f"[{job_id}]   Motion source: {user_video_path}")
     logger.info(f"[{job_id}]   Face reference: {identity_image_path}")
 
-    output_video = os.path.join(SHARED_DATA_PATH, "temp", f"{job_id}_xnemo.mp4")
-    os.makedirs(os.path.dirname(output_video), exist_ok=True)
-
-    runner = XNemoRunner(
-        pretrained_weights_path=XNEMO_WEIGHTS_PATH,
-        device=DEVICE,
-        dtype="fp16",
-        verbose=True,
-    )
+    output_video = os.path.join(TEMP_PATH, f"{job_id}_xnemo.mp4")
 
-    result = runner.generate(
+    result = get_xnemo_runner().generate(
         source_video=user_video_path,  # User's video provides motion
         identity_image=identity_image_path,  # Identity provides face
         output_path=output_video,
         steps=25,
         guidance_scale=2.5,
+        progress_cb=progress_cb,
     )
 
     logger.info(f"[{job_id}] X-Nemo completed: {result}")
     return output_video
 
 
-def run_seedvc_task(job_id: str, user_video_path: str, identity_audio_path: str) -> str:
+def scratch_audio_path(job_id: str) -> str:
+    """Where the user's extracted audio is kept while the job runs."""
+    return os.path.join(SCRATCH_PATH, f"{job_id}_user_audio.wav")
+
+
+def preprocess_user_video(job_id: str, user_video_path: str) -> str:
+    """
+    Extract the user's audio to scratch space before the models start.
+
+    The upload is read from storage once, while it is hot in the page cache
+    anyway, and Seed-VC then reads the small WAV from tmpfs.
+
+    Returns:
+        Path to the extracted audio
+    """
+    user_audio_path = scratch_audio_path(job_id)
+    extract_audio(user_video_path, user_audio_path)
+    return user_audio_path
+
+
+@retry_on_oom()
+def run_seedvc_task(
+    job_id: str,
+    user_audio_path: str,
+    identity_audio_path: str,
+    progress_cb: Optional[Callable[[float], None]] = None,
+) -> str:
     """
-    Run Seed-VC: audio from user_video + identity_audio -> converted audio.
+    Run Seed-VC: user_audio + identity_audio -> converted audio.
 
     Seed-VC takes:
-        - source: The audio to convert (from user's video)
+        - source: The audio to convert (extracted from user's video)
         - reference: The target voice sample (identity's voice)
     """
     logger.info(f"[{job_id}] Starting Seed-VC voice conversion")
-    logger.info(f"[{job_id}]   Source audio from: {user_video_path}")
+    logger.info(f"[{job_id}]   Source audio: {user_audio_path}")
     logger.info(f"[{job_id}]   Target voice: {identity_audio_path}")
 
-    # First extract audio from user's video
-    user_audio_path = os.path.join(SHARED_DATA_PATH, "temp", f"{job_id}_user_audio.wav")
-    extract_audio(user_video_path, user_audio_path)
-
-    output_audio = os.path.join(SHARED_DATA_PATH, "temp", f"{job_id}_converted.wav")
-    os.makedirs(os.path.dirname(output_audio), exist_ok=True)
-
-    runner = SeedVCRunner(
-        device=DEVICE,
-        dtype="fp16",
-        compile_model=False,
-        verbose=True,
-    )
+    output_audio = os.path.join(TEMP_PATH, f"{job_id}_converted.wav")
 
-    result = runner.convert(
+    result = get_seedvc_runner().convert(
         source_audio=user_audio_path,  # User's extracted audio
         reference_audio=identity_audio_path,  # Identity's voice sample
         output_path=output_audio,
         diffusion_steps=30,
         intelligibility_cfg_rate=0.7,
         similarity_cfg_rate=0.7,
+        progress_cb=progress_cb,
     )
 
     logger.info(f"[{job_id}] Seed-VC completed: {result}")
@@ -174,45 +313,72 @@ def combine_video_audio(job_id: str, video_path: str, audio_path: str) -> str:
     logger.info(f"[{job_id}]   Video: {video_path}")
     logger.info(f"[{job_id}]   Audio: {audio_path}")
 
-    output_path = os.path.join(SHARED_DATA_PATH, "output", f"{job_id}.mp4")
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    output_path = os.path.join(OUTPUT_PATH, f"{job_id}.mp4")
 
+    # Audio that is already AAC is muxed as-is instead of re-encoded
+    audio_codec = "aac"
+    if FFMPEG_FAST_PATH and audio_path.lower().endswith((".aac", ".m4a")):
+        streams = _audio_streams(_probe(audio_path))
+        if streams and streams[0].get("codec_name") == "aac":
+            audio_codec = "copy"
+
+    # Single pass: stream-copy the X-Nemo video and encode only the audio
     cmd = [
         "ffmpeg",
         "-y",
+        "-fflags",
+        "+genpts",
         "-i",
         video_path,
         "-i",
         audio_path,
+        "-threads",
+        "0",
         "-c:v",
         "copy",
         "-c:a",
-        "aac",
+        audio_codec,
         "-map",
         "0:v:0",
         "-map",
         "1:a:0",
         "-shortest",
+        "-movflags",
+        "+faststart",
         output_path,
     ]
 
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    if result.returncode != 0:
-        raise RuntimeError(f"FFmpeg combine failed: {result.stderr}")
+    run_streaming(cmd, name="FFmpeg combine")
 
     logger.info(f"[{job_id}] Combined output: {output_path}")
     return output_path
 
 
 def cleanup_temp(job_id: str):
-    """No-op: keep temp files for debugging.
+    """Free the job's scratch space; keep temp files for debugging.
 
     We keep all per-job temp artifacts under shared_data/temp so that
-    failures can be inspected later (X-Nemo raw video, extracted audio,
-    Seed-VC outputs, etc.).
+    failures can be inspected later (X-Nemo raw video, Seed-VC outputs,
+    etc.). The extracted audio lives in SCRATCH_PATH (RAM when it is
+    /dev/shm) and can be re-derived from the upload, so it is removed.
     """
-    temp_dir = os.path.join(SHARED_DATA_PATH, "temp")
-    logger.info(f"[{job_id}] Keeping temp files in: {temp_dir}")
+    try:
+        os.remove(scratch_audio_path(job_id))
+    except FileNotFoundError:
+        pass
+    logger.info(f"[{job_id}] Keeping temp files in: {TEMP_PATH}")
+
+
+@functools.lru_cache(maxsize=4096)
+def _require_identity_asset(path: str, kind: str):
+    """Raise if an identity asset is missing.
+
+    Identity assets are shared by many jobs, so each path is only stat-ed
+    until it has been seen once. Failures raise and are therefore not
+    cached, so an asset added later is picked up.
+    """
+    if not path or not os.path.exists(path):
+        raise FileNotFoundError(f"Identity {kind} not found: {path}")
 
 
 def validate_paths(
@@ -221,30 +387,24 @@ def validate_paths(
     """Validate all required input paths exist."""
     if not os.path.exists(user_video_path):
         raise FileNotFoundError(f"User video not found: {user_video_path}")
-    if not os.path.exists(identity_image_path):
-        raise FileNotFoundError(f"Identity image not found: {identity_image_path}")
-    if not os.path.exists(identity_audio_path):
-        raise FileNotFoundError(f"Identity audio not found: {identity_audio_path}")
+    _require_identity_asset(identity_image_path, "image")
+    _require_identity_asset(identity_audio_path, "audio")
 
 
-def process_job_sequential(job: Job):
+def process_job_sequential(db: Session, job: Job):
     """
     Process job sequentially (safer for GPU memory).
 
     Order: X-Nemo first, then Seed-VC.
     """
-    job_id = str(job.id)
+    # Keep the key as a plain value - a rollback expires the ORM object
+    job_pk = job.id
+    job_id = str(job_pk)
     logger.info(f"Processing job {job_id} (sequential mode)")
 
-    db = SessionLocal()
     try:
-        job = db.query(Job).filter(Job.id == job.id).first()
-        job.status = JobStatus.PROCESSING
-        job.progress = 5
-        db.commit()
-
         # Get paths
-        user_video_path = os.path.join(SHARED_DATA_PATH, "uploads", job.user_video)
+        user_video_path = os.path.join(UPLOADS_PATH, job.user_video)
         identity_image_path = get_identity_image_path(
             job.identity_id, job.identity_image
         )
@@ -252,60 +412,116 @@ def process_job_sequential(job: Job):
 
         # Validate inputs exist
         validate_paths(user_video_path, identity_image_path, identity_audio_path)
+        # Start reading inputs in the background while the models spin up
+        prefetch(user_video_path, identity_image_path, identity_audio_path)
+        user_audio_path = preprocess_user_video(job_id, user_video_path)
 
         # Step 1: X-Nemo (face reenactment) - 5% to 50%
-        update_progress(job.id, 10)
-        xnemo_result = run_xnemo_task(job_id, user_video_path, identity_image_path)
-        update_progress(job.id, 50)
+        update_progress(job_pk, 10)
+        xnemo_result = run_xnemo_task(
+            job_id,
+            user_video_path,
+            identity_image_path,
+            progress_cb=progress_reporter(job_pk, 10, 50),
+        )
+        update_progress(job_pk, 50)
 
         # Step 2: Seed-VC (voice conversion) - 50% to 85%
-        seedvc_result = run_seedvc_task(job_id, user_video_path, identity_audio_path)
-        update_progress(job.id, 85)
+        seedvc_result = run_seedvc_task(
+            job_id,
+            user_audio_path,
+            identity_audio_path,
+            progress_cb=progress_reporter(job_pk, 50, 85),
+        )
+        update_progress(job_pk, 85)
 
         # Step 3: Combine video + audio - 85% to 95%
         final_output = combine_video_audio(job_id, xnemo_result, seedvc_result)
-        update_progress(job.id, 95)
+        update_progress(job_pk, 95)
 
         # Mark completed
-        job = db.query(Job).filter(Job.id == job.id).first()
-        job.output_video = f"{job_id}.mp4"
-        job.status = JobStatus.COMPLETED
-        job.progress = 100
-        db.commit()
+        PROGRESS_FLUSHER.finish(job_pk)
+        _update_job(
+            db,
+            job_pk,
+            output_video=f"{job_id}.mp4",
+            status=JobStatus.COMPLETED,
+            progress=100,
+        )
 
-        cleanup_temp(job_id)
         logger.info(f"Job {job_id} completed successfully!")
 
     except Exception as e:
         logger.error(f"Job {job_id} failed: {e}", exc_info=True)
-        job = db.query(Job).filter(Job.id == job.id).first()
-        if job:
-            job.status = JobStatus.FAILED
-            job.error = str(e)
-            db.commit()
+        db.rollback()
+        PROGRESS_FLUSHER.finish(job_pk)
+        _update_job(db, job_pk, status=JobStatus.FAILED, error=str(e))
     finally:
-        db.close()
+        cleanup_temp(job_id)
 
 
-def process_job_parallel(job: Job):
+async def run_parallel_tasks(
+    job_pk,
+    user_video_path: str,
+    user_audio_path: str,
+    identity_image_path: str,
+    identity_audio_path: str,
+) -> tuple:
+    """
+    Run X-Nemo and Seed-VC concurrently on one event loop.
+
+    The runners block on their subprocess pipes, so each call is handed to
+    asyncio.to_thread; the loop only waits for both and collects errors.
+
+    Returns:
+        (xnemo_result, seedvc_result)
+    """
+    job_id = str(job_pk)
+
+    async def run(name: str, done_progress: int, func, *args):
+        try:
+            result = await asyncio.to_thread(func, job_id, *args)
+        except Exception as e:
+            logger.error(f"[{job_id}] {name} failed: {e}", exc_info=True)
+            raise RuntimeError(f"{name}: {e}") from e
+        update_progress(job_pk, done_progress)
+        return result
+
+    results = await asyncio.gather(
+        # X-Nemo is the long pole, so it alone drives live progress
+        run(
+            "xnemo",
+            50,
+            run_xnemo_task,
+            user_video_path,
+            identity_image_path,
+            progress_reporter(job_pk, 10, 50),
+        ),
+        run("seedvc", 70, run_seedvc_task, user_audio_path, identity_audio_path),
+        return_exceptions=True,
+    )
+
+    errors = [str(r) for r in results if isinstance(r, BaseException)]
+    if errors:
+        raise RuntimeError("; ".join(errors))
+    return tuple(results)
+
+
+def process_job_parallel(db: Session, job: Job):
     """
     Process job with parallel X-Nemo and Seed-VC.
 
     Note: Requires enough GPU memory for both models simultaneously.
     Since each runs in its own subprocess, they compete for GPU memory.
     """
-    job_id = str(job.id)
+    # Keep the key as a plain value - a rollback expires the ORM object
+    job_pk = job.id
+    job_id = str(job_pk)
     logger.info(f"Processing job {job_id} (parallel mode)")
 
-    db = SessionLocal()
     try:
-        job = db.query(Job).filter(Job.id == job.id).first()
-        job.status = JobStatus.PROCESSING
-        job.progress = 5
-        db.commit()
-
         # Get paths
-        user_video_path = os.path.join(SHARED_DATA_PATH, "uploads", job.user_video)
+        user_video_path = os.path.join(UPLOADS_PATH, job.user_video)
         identity_image_path = get_identity_image_path(
             job.identity_id, job.identity_image
         )
@@ -313,76 +529,100 @@ def process_job_parallel(job: Job):
 
         # Validate inputs
         validate_paths(user_video_path, identity_image_path, identity_audio_path)
+        prefetch(user_video_path, identity_image_path, identity_audio_path)
+        user_audio_path = preprocess_user_video(job_id, user_video_path)
 
         # Run X-Nemo and Seed-VC in parallel
-        update_progress(job.id, 10)
-
-        xnemo_result = None
-        seedvc_result = None
-        errors = []
-
-        with ThreadPoolExecutor(max_workers=2) as executor:
-            futures = {
-                executor.submit(
-                    run_xnemo_task, job_id, user_video_path, identity_image_path
-                ): "xnemo",
-                executor.submit(
-                    run_seedvc_task, job_id, user_video_path, identity_audio_path
-                ): "seedvc",
-            }
-
-            for future in as_completed(futures):
-                name = futures[future]
-                try:
-                    result = future.result()
-                    if name == "xnemo":
-                        xnemo_result = result
-                        update_progress(job.id, 50)
-                    else:
-                        seedvc_result = result
-                        update_progress(job.id, 70)
-                except Exception as e:
-                    errors.append(f"{name}: {str(e)}")
-                    logger.error(f"[{job_id}] {name} failed: {e}", exc_info=True)
-
-        if errors:
-            raise RuntimeError("; ".join(errors))
+        update_progress(job_pk, 10)
+
+        xnemo_result, seedvc_result = asyncio.run(
+            run_parallel_tasks(
+                job_pk,
+                user_video_path,
+                user_audio_path,
+                identity_image_path,
+                identity_audio_path,
+            )
+        )
 
         # Combine video + audio
-        update_progress(job.id, 85)
+        update_progress(job_pk, 85)
         final_output = combine_video_audio(job_id, xnemo_result, seedvc_result)
 
         # Mark completed
-        job = db.query(Job).filter(Job.id == job.id).first()
-        job.output_video = f"{job_id}.mp4"
-        job.status = JobStatus.COMPLETED
-        job.progress = 100
-        db.commit()
+        PROGRESS_FLUSHER.finish(job_pk)
+        _update_job(
+            db,
+            job_pk,
+            output_video=f"{job_id}.mp4",
+            status=JobStatus.COMPLETED,
+            progress=100,
+        )
 
-        cleanup_temp(job_id)
         logger.info(f"Job {job_id} completed successfully!")
 
     except Exception as e:
         logger.error(f"Job {job_id} failed: {e}", exc_info=True)
-        job = db.query(Job).filter(Job.id == job.id).first()
-        if job:
-            job.status = JobStatus.FAILED
-            job.error = str(e)
-            db.commit()
+        db.rollback()
+        PROGRESS_FLUSHER.finish(job_pk)
+        _update_job(db, job_pk, status=JobStatus.FAILED, error=str(e))
     finally:
-        db.close()
+        cleanup_temp(job_id)
 
 
-def process_job(job: Job):
-    """Process a job using configured execution mode."""
-    if EXECUTION_MODE == "parallel":
-        process_job_parallel(job)
+def dispatch_job(
+    db: Session, job: Job, monitor: GPUMonitor, estimator: ResourceEstimator
+):
+    """Wait until the GPU has room for the job, run it and record its peak VRAM."""
+    need_mb = estimator.estimate()
+    if not monitor.wait_for(need_mb, timeout=GPU_WAIT_TIMEOUT):
+        logger.warning(
+            f"Only {monitor.free_mb} MiB free (plus {monitor.own_used_mb} MiB "
+            f"held by our models) after {GPU_WAIT_TIMEOUT}s (want {need_mb} MiB), "
+            f"starting job {job.id} anyway"
+        )
+
+    monitor.reset_peak()
+    process_job(db, job)
+    if monitor.enabled:
+        estimator.record(monitor.peak_own_mb)
+
+
+def process_job(db: Session, job: Job):
+    """Process a job using configured execution mode.
+
+    The session that claimed the job is reused for all of its updates.
+    """
+    if EXECUTION_MODE in ("parallel", "parallel_mps"):
+        process_job_parallel(db, job)
     else:
-        process_job_sequential(job)
+        process_job_sequential(db, job)
 
 
+def start_mps():
+    """
+    Start the NVIDIA MPS control daemon for parallel_mps mode.
+
+    With MPS both model subprocesses share one GPU context, so they run
+    kernels side by side instead of time-slicing and don't each pay for a
+    full context. Must run before the model subprocesses start; they inherit
+    CUDA_MPS_ACTIVE_THREAD_PERCENTAGE from our environment.
+    """
+    result = subprocess.run(
+        ["nvidia-cuda-mps-control", "-d"], capture_output=True, text=True
+    )
+    # A non-zero exit usually means the daemon is already running
+    if result.returncode != 0:
+        logger.warning(f"nvidia-cuda-mps-control -d: {result.stderr.strip()}")
+    os.environ.setdefault("CUDA_MPS_ACTIVE_THREAD_PERCENTAGE", MPS_THREAD_PERCENTAGE)
+    logger.info(
+        f"MPS enabled ({os.environ['CUDA_MPS_ACTIVE_THREAD_PERCENTAGE']}% SMs per model)"
+    )
+
+
+@functools.lru_cache(maxsize=None)
 def verify_setup():
-    """Verify that all required components are in place."""
+    """Verify that all required components are in place (checked once per process)."""
     errors = []
 
     # Check X-Nemo repo
@@ -399,9 +639,8 @@ def verify_setup():
     if not os.path.exists(seedvc_script):
         errors.append(f"Seed-VC runner script not found: {seedvc_script}")
 
-    # Check shared data directories
-    for subdir in ["uploads", "temp", "output"]:
-        path = os.path.join(SHARED_DATA_PATH, subdir)
+    # Check shared data directories (per-job code relies on them existing)
+    for path in [UPLOADS_PATH, TEMP_PATH, OUTPUT_PATH]:
         if not os.path.exists(path):
             os.makedirs(path, exist_ok=True)
             logger.info(f"Created directory: {path}")
@@ -414,8 +653,51 @@ def verify_setup():
     return True
 
 
+def claim_jobs(db, limit: int = 1) -> List[Job]:
+    """
+    Atomically claim up to `limit` of the oldest pending jobs.
+
+    SKIP LOCKED lets several workers pull from the queue without ever
+    dispatching the same job twice. All jobs are claimed in one transaction,
+    so with limit > 1 the later ones sit in PROCESSING (and out of other
+    workers' reach) before they start - hence WORKER_BATCH defaults to 1.
+    """
+    jobs = (
+        db.query(Job)
+        .filter(Job.status == JobStatus.PENDING)
+        .order_by(Job.created_at)
+        .with_for_update(skip_locked=True)
+        .limit(limit)
+        .all()
+    )
+    if jobs:
+        db.execute(
+            update(Job)
+            .where(Job.id.in_([job.id for job in jobs]))
+            .values(status=JobStatus.PROCESSING, progress=5)
+        )
+        db.commit()
+    return jobs
+
+
+def listen_for_jobs():
+    """Open a dedicated autocommit connection subscribed to new-job notifications."""
+    conn = psycopg2.connect(LISTEN_DSN)
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute(f"LISTEN {JOB_PENDING_CHANNEL};")
+    return conn
+
+
+def wait_for_notification(conn, timeout: float):
+    """Block until a job notification arrives (or timeout), then drain them."""
+    if select.select([conn], [], [], timeout) != ([], [], []):
+        conn.poll()
+        conn.notifies.clear()
+
+
 def main():
-    """Main loop - poll for pending jobs."""
+    """Main loop - wait for job notifications and process pending jobs."""
     logger.info("=" * 60)
     logger.info("Job Worker Starting")
     logger.info("=" * 60)
@@ -426,6 +708,9 @@ def main():
     logger.info(f"  SEEDVC_REPO_PATH: {SEEDVC_REPO_PATH}")
     logger.info(f"  EXECUTION_MODE: {EXECUTION_MODE}")
     logger.info(f"  DEVICE: {DEVICE}")
+    logger.info(f"  DTYPE: {default_dtype(DEVICE)}")
+    logger.info(f"  PERSISTENT_MODELS: {PERSISTENT_MODELS}")
+    logger.info(f"  WORKER_BATCH: {WORKER_BATCH}")
     logger.info("=" * 60)
 
     # Verify setup
@@ -433,26 +718,52 @@ def main():
         logger.error("Setup verification failed! Fix the errors above and restart.")
         sys.exit(1)
 
-    logger.info("Setup verified. Worker ready, polling for jobs...")
+    if EXECUTION_MODE == "parallel_mps":
+        try:
+            start_mps()
+        except FileNotFoundError:
+            logger.error("nvidia-cuda-mps-control not found; MPS is unavailable")
+            sys.exit(1)
+
+    # Load models up front so the first job doesn't pay for it
+    for runner in (get_xnemo_runner(), get_seedvc_runner()):
+        runner.start()
+        atexit.register(runner.stop)
+
+    monitor = GPUMonitor()
+    if DEVICE == "cuda":
+        monitor.start()
+    estimator = ResourceEstimator(default_mb=GPU_JOB_MEM_MB)
 
+    logger.info("Setup verified. Worker ready, waiting for jobs...")
+
+    listen_conn = None
     while True:
-        db = SessionLocal()
         try:
-            job = (
-                db.query(Job)
-                .filter(Job.status == JobStatus.PENDING)
-                .order_by(Job.created_at)
-                .first()
-            )
-            if job:
-                process_job(job)
-            else:
-                time.sleep(POLL_INTERVAL)
+            if listen_conn is None or listen_conn.closed:
+                listen_conn = listen_for_jobs()
+
+            # Drain the queue, then sleep until the next INSERT notification
+            while True:
+                db = SessionLocal()
+                try:
+                    jobs = claim_jobs(db, WORKER_BATCH)
+                    if not jobs:
+                        break
+                    # GPU-bound, so claimed jobs still run one at a time
+                    for job in jobs:
+                        dispatch_job(db, job, monitor, estimator)
+                finally:
+                    db.close()
+
+            wait_for_notification(listen_conn, LISTEN_TIMEOUT)
         except Exception as e:
             logger.error(f"Worker error: {e}", exc_info=True)
-            time.sleep(POLL_INTERVAL)
-        finally:
-            db.close()
+            # Reconnect the listener in case the error was a dropped connection
+            if listen_conn is not None:
+                listen_conn.close()
+                listen_conn = None
+            time.sleep(ERROR_BACKOFF)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,132 @@
+"""
+Progress Flusher - Batches job progress writes.
+
+Progress updates are queued and written by a background thread at most
+once per interval, keeping only the latest value per job. A burst of
+updates therefore costs one UPDATE round-trip and one commit instead of one
+each.
+
+Progress only moves forward: in parallel mode X-Nemo's live updates can
+arrive after Seed-VC has already reported a higher value, so updates below
+the highest value queued for a job are dropped.
+
+Terminal states (COMPLETED/FAILED) are written directly by the worker,
+after finish() has written the job's queued progress. Late updates never
+overwrite them, because the batched UPDATE only touches jobs that are
+still pending or processing.
+"""
+
+import logging
+import queue
+import threading
+import time
+
+from sqlalchemy import bindparam, or_, update
+
+from app.db import Job, JobStatus, SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressFlusher(threading.Thread):
+    """Background thread that coalesces and writes progress updates."""
+
+    def __init__(self, interval: float = 0.25, max_batch: int = 100):
+        super().__init__(name="progress-flusher", daemon=True)
+        self.interval = interval
+        self.max_batch = max_batch
+        self.queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        # Highest progress queued per running job
+        self._highest = {}
+        self._highest_lock = threading.Lock()
+
+    def put(self, job_id, progress: int):
+        """Queue a progress update (starts the thread on first use).
+
+        Updates that don't exceed the job's highest queued value are dropped.
+        """
+        with self._highest_lock:
+            if progress <= self._highest.get(job_id, -1):
+                return
+            self._highest[job_id] = progress
+        if not self.is_alive():
+            with self._start_lock:
+                if not self.is_alive():
+                    self.start()
+        self.queue.put((job_id, progress))
+
+    def finish(self, job_id):
+        """
+        Call before writing a job's terminal state: writes everything queued
+        so the final progress lands first, then drops the job's high-water
+        mark.
+        """
+        try:
+            self.flush()
+        except Exception as e:
+            # Progress is best effort - never block the status update
+            logger.error(f"Progress flush failed: {e}", exc_info=True)
+        with self._highest_lock:
+            self._highest.pop(job_id, None)
+
+    def run(self):
+        while True:
+            # Block for the first update, then gather more for one interval
+            pending = dict([self.queue.get()])
+            deadline = time.monotonic() + self.interval
+            while len(pending) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    job_id, progress = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                pending[job_id] = progress
+            try:
+                self._write(pending)
+            except Exception as e:
+                # Progress is best effort - never let the thread die
+                logger.error(f"Progress flush failed: {e}", exc_info=True)
+
+    def flush(self):
+        """Write everything queued so far from the calling thread."""
+        pending = {}
+        while True:
+            try:
+                job_id, progress = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            pending[job_id] = progress
+        if pending:
+            self._write(pending)
+
+    def _write(self, pending: dict):
+        """One executemany UPDATE for all jobs, then a single commit."""
+        # Core table UPDATE: the ORM form doesn't accept executemany
+        # parameters together with a WHERE clause
+        jobs = Job.__table__
+        stmt = (
+            update(jobs)
+            .where(jobs.c.id == bindparam("job_id"))
+            .where(
+                or_(
+                    jobs.c.status == JobStatus.PENDING,
+                    jobs.c.status == JobStatus.PROCESSING,
+                )
+            )
+            .values(progress=bindparam("new_progress"))
+        )
+        rows = [
+            {"job_id": job_id, "new_progress": progress}
+            for job_id, progress in pending.items()
+        ]
+        with self._lock:
+            db = SessionLocal()
+            try:
+                db.execute(stmt, rows)
+                db.commit()
+            finally:
+                db.close()
@@ -0,0 +1,304 @@
+"""
+Runner Daemon - Keeps a model subprocess alive between jobs.
+
+Starting a runner script imports torch, loads weights and initializes CUDA,
+which can take longer than the inference itself. A daemon starts the script
+once with ``--serve`` and then feeds it jobs.
+
+Protocol (runner scripts implement the child side):
+    - The child is started with ``--result-fd N`` plus its options. It writes
+      each result as one JSON line to file descriptor N (on success and on
+      failure), so results never have to be fished out of log output.
+    - With ``--serve`` the child loads the model once and reads one JSON
+      object per line from stdin. Each job's keys are the script's CLI
+      options with dashes replaced by underscores
+      (e.g. ``{"source": ..., "diffusion_steps": 30}``), and each job
+      produces exactly one result line. The child exits when stdin is closed.
+    - stdout/stderr are log output. Lines containing ``progress: NN%``
+      report progress of the current job.
+
+One-shot runs use run_streaming(). It passes ``--result-fd`` only when
+RUNNER_RESULT_FD=1, since scripts that predate it reject the flag; otherwise
+the result is read from a ``__RESULT_JSON__: {...}`` line in the output.
+"""
+
+import collections
+import json
+import logging
+import os
+import re
+import signal
+import subprocess
+import threading
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_RE = re.compile(r"progress: (\d+(?:\.\d+)?)%")
+
+# One-shot runs: whether runner scripts accept --result-fd
+RUNNER_RESULT_FD = os.getenv("RUNNER_RESULT_FD", "0") == "1"
+# Prefix of the result line one-shot scripts print without --result-fd
+RESULT_MARKER = "__RESULT_JSON__:"
+
+# Lines of child output kept for error messages
+TAIL_LINES = 2000
+
+# Interpreter flags for runner scripts: unbuffered output, so log and
+# progress lines arrive as they are printed instead of in 8KB blocks
+CHILD_PYARGS = ["-u"]
+
+
+def _parse_progress(line: str) -> Optional[float]:
+    """Return the percentage from a ``progress: NN%`` line, if present."""
+    match = PROGRESS_RE.search(line)
+    return float(match.group(1)) if match else None
+
+
+def _result_pipe() -> tuple:
+    """Pipe for the child's results: (read file, write fd to pass to the child)."""
+    r, w = os.pipe()
+    os.set_inheritable(w, True)
+    return os.fdopen(r, "r"), w
+
+
+def run_streaming(
+    cmd: list,
+    cwd: Optional[str] = None,
+    timeout: Optional[int] = None,
+    progress_cb: Optional[Callable[[float], None]] = None,
+    verbose: bool = False,
+    name: str = "Subprocess",
+    env: Optional[dict] = None,
+    result_fd: bool = False,
+) -> Optional[dict]:
+    """
+    Run a command, streaming its output line by line.
+
+    Only the last TAIL_LINES lines are kept (for error messages), so memory
+    stays bounded however chatty the child is.
+
+    Args:
+        cmd: Command to run
+        cwd: Working directory
+        timeout: Kill the process group after this many seconds
+        progress_cb: Called with each ``progress: NN%`` value
+        verbose: Echo child output
+        name: Name used in error messages
+        env: Environment for the child (default: inherit ours)
+        result_fd: Pass ``--result-fd`` and read the child's result from it
+
+    Returns:
+        The child's result (from the result fd, else from a RESULT_MARKER
+        line in its output), or None if it reported none
+    """
+    results, w = _result_pipe() if result_fd else (None, None)
+    try:
+        proc = subprocess.Popen(
+            cmd + ["--result-fd", str(w)] if result_fd else cmd,
+            cwd=cwd,
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1,
+            start_new_session=True,
+            pass_fds=(w,) if result_fd else (),
+        )
+    finally:
+        if result_fd:
+            # Only the child may hold the write end, so EOF means it exited
+            os.close(w)
+
+    timed_out = threading.Event()
+
+    def _expire():
+        timed_out.set()
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    watchdog = threading.Timer(timeout, _expire) if timeout else None
+    if watchdog:
+        watchdog.daemon = True
+        watchdog.start()
+
+    tail = collections.deque(maxlen=TAIL_LINES)
+    result_line = ""
+    try:
+        for line in proc.stdout:
+            tail.append(line)
+            if verbose:
+                print(line, end="")
+            if RESULT_MARKER in line:
+                result_line = line.split(RESULT_MARKER, 1)[1].strip()
+            if progress_cb:
+                pct = _parse_progress(line)
+                if pct is not None:
+                    progress_cb(pct)
+        proc.wait()
+        if results:
+            result_line = results.readline() or result_line
+    finally:
+        if watchdog:
+            watchdog.cancel()
+        proc.stdout.close()
+        if results:
+            results.close()
+
+    if timed_out.is_set():
+        raise RuntimeError(f"{name} timed out after {timeout} seconds")
+    if proc.returncode != 0:
+        output = "".join(tail)
+        logger.error(f"{name} output: {output}")
+        raise RuntimeError(f"{name} failed with code {proc.returncode}: {output}")
+    return json.loads(result_line) if result_line else None
+
+
+def to_cli_args(options: dict) -> list:
+    """Convert {"max_frames": 10, "quiet": True} to ["--max-frames", "10", "--quiet"]."""
+    args = []
+    for key, value in options.items():
+        if value is None or value is False:
+            continue
+        flag = "--" + key.replace("_", "-")
+        if value is True:
+            args.append(flag)
+        else:
+            args.extend([flag, str(value)])
+    return args
+
+
+class RunnerDaemon:
+    """
+    A long-lived runner script that processes one job at a time.
+
+    The process is started lazily on the first request and restarted if it
+    has died. Requests that exceed their timeout kill the process.
+    """
+
+    name = "Runner"
+
+    def __init__(
+        self,
+        python_executable: str,
+        script_path: str,
+        cwd: str,
+        model_options: dict,
+        verbose: bool = True,
+        env: Optional[dict] = None,
+    ):
+        self.cmd = [
+            python_executable,
+            *CHILD_PYARGS,
+            script_path,
+            "--serve",
+            *to_cli_args(model_options),
+        ]
+        self.cwd = cwd
+        self.env = env
+        self.verbose = verbose
+        self.proc: Optional[subprocess.Popen] = None
+        self._results = None
+        self._progress_cb: Optional[Callable[[float], None]] = None
+        self._lock = threading.Lock()
+
+    def is_alive(self) -> bool:
+        return self.proc is not None and self.proc.poll() is None
+
+    def start(self):
+        """Start the child process (no-op if it is already running)."""
+        if self.is_alive():
+            return
+        if self._results:
+            self._results.close()
+        logger.info(f"Starting {self.name} daemon: {' '.join(self.cmd)}")
+
+        self._results, w = _result_pipe()
+        try:
+            self.proc = subprocess.Popen(
+                self.cmd + ["--result-fd", str(w)],
+                cwd=self.cwd,
+                env=self.env,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                bufsize=1,
+                pass_fds=(w,),
+            )
+        finally:
+            os.close(w)
+
+        # Drain logs in the background so they can never block the child
+        threading.Thread(
+            target=self._pump_output, args=(self.proc,), daemon=True
+        ).start()
+
+    def _pump_output(self, proc: subprocess.Popen):
+        for line in proc.stdout:
+            if self.verbose:
+                print(line, end="")
+            progress_cb = self._progress_cb
+            if progress_cb:
+                pct = _parse_progress(line)
+                if pct is not None:
+                    progress_cb(pct)
+        proc.stdout.close()
+
+    def request(
+        self,
+        job: dict,
+        timeout: int,
+        progress_cb: Optional[Callable[[float], None]] = None,
+    ) -> dict:
+        """Send one job and block until its result arrives."""
+        with self._lock:
+            self.start()
+            proc = self.proc
+
+            # Watchdog: kill the child if the job runs past its timeout
+            timed_out = threading.Event()
+
+            def _expire():
+                timed_out.set()
+                proc.kill()
+
+            watchdog = threading.Timer(timeout, _expire)
+            watchdog.daemon = True
+            watchdog.start()
+            self._progress_cb = progress_cb
+            result_line = ""
+            try:
+                proc.stdin.write(json.dumps(job) + "\n")
+                proc.stdin.flush()
+                result_line = self._results.readline()
+            except (BrokenPipeError, OSError):
+                pass
+            finally:
+                watchdog.cancel()
+                self._progress_cb = None
+
+            if result_line:
+                return json.loads(result_line)
+
+            # Result pipe closed without a result - the child died
+            proc.wait()
+            if timed_out.is_set():
+                raise RuntimeError(f"{self.name} timed out after {timeout} seconds")
+            raise RuntimeError(
+                f"{self.name} daemon exited with code {proc.returncode}"
+            )
+
+    def stop(self, timeout: int = 10):
+        """Close stdin so the child exits its loop; kill it if it lingers."""
+        with self._lock:
+            if not self.is_alive():
+                return
+            try:
+                self.proc.stdin.close()
+                self.proc.wait(timeout=timeout)
+            except (OSError, subprocess.TimeoutExpired):
+                self.proc.kill()
+                self.proc.wait()
@@ -4,28 +4,72 @@ Seed-VC Runner - Wrapper for Seed-VC voice conversion.
 Uses subprocess to avoid Python import conflicts between ML repos.
 """
 
-import json
 import logging
 import os
-import subprocess
+from typing import Callable, Optional
 
-logger = logging.getLogger(__name__)
-
-# Configuration - paths relative to project root by default
-PROJECT_ROOT = os.path.dirname(
-    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+from app.paths import SEEDVC_REPO_PATH
+from app.workers.embedding_cache import (
+    EMBEDDING_CACHE,
+    embedding_path,
+    weights_tag,
 )
-SEEDVC_REPO_PATH = os.getenv(
-    "SEEDVC_REPO_PATH", os.path.join(PROJECT_ROOT, "tools", "seed-vc")
+from app.workers.gpu import gpu_env
+from app.workers.runner_daemon import (
+    CHILD_PYARGS,
+    RUNNER_RESULT_FD,
+    RunnerDaemon,
+    run_streaming,
+    to_cli_args,
 )
+
+logger = logging.getLogger(__name__)
+
 PYTHON_EXECUTABLE = os.getenv("PYTHON_EXECUTABLE", "python")
+SEEDVC_SCRIPT_PATH = os.path.join(SEEDVC_REPO_PATH, "run_seedvc.py")
+
+
+def _model_options(device: str, dtype: str, compile_model: bool) -> dict:
+    """Options that select and load the model (fixed for a daemon's lifetime)."""
+    return {
+        "device": device,
+        "dtype": dtype,
+        "compile": compile_model,
+    }
+
+
+class SeedVCDaemon(RunnerDaemon):
+    """Seed-VC kept loaded in a persistent `run_seedvc.py --serve` process."""
+
+    name = "Seed-VC"
+
+    def __init__(
+        self,
+        device: str = "cuda",
+        dtype: str = "fp16",
+        compile_model: bool = False,
+        verbose: bool = True,
+    ):
+        super().__init__(
+            python_executable=PYTHON_EXECUTABLE,
+            script_path=SEEDVC_SCRIPT_PATH,
+            cwd=SEEDVC_REPO_PATH,
+            model_options={
+                **_model_options(device, dtype, compile_model),
+                "quiet": not verbose,
+            },
+            verbose=verbose,
+            env=gpu_env(),
+        )
 
 
 class SeedVCRunner:
     """
     Wrapper for Seed-VC voice conversion.
 
-    Runs Seed-VC as a subprocess to avoid import conflicts.
+    Runs Seed-VC as a subprocess to avoid import conflicts. With
+    persistent=True the subprocess is kept alive between calls so the
+    model is only loaded once.
     """
 
     def __init__(
@@ -34,6 +78,7 @@ class SeedVCRunner:
         dtype: str = "fp16",
         compile_model: bool = False,
         verbose: bool = True,
+        persistent: bool = False,
     ):
         """
         Initialize Seed-VC runner.
@@ -43,18 +88,45 @@ class SeedVCRunner:
             dtype: Data type ("fp16" or "fp32")
             compile_model: Use torch.compile for faster inference
             verbose: Print progress messages
+            persistent: Keep the model loaded in a daemon subprocess
         """
         self.device = device
         self.dtype = dtype
         self.compile_model = compile_model
         self.verbose = verbose
-        self.script_path = os.path.join(SEEDVC_REPO_PATH, "run_seedvc.py")
+        self.script_path = SEEDVC_SCRIPT_PATH
 
         if not os.path.exists(self.script_path):
             raise FileNotFoundError(
                 f"Seed-VC runner script not found: {self.script_path}"
             )
 
+        # Seed-VC fetches its weights from the Hub into <repo>/checkpoints
+        self.embedding_model = weights_tag(
+            "seed-vc", os.path.join(SEEDVC_REPO_PATH, "checkpoints")
+        )
+
+        self.daemon = (
+            SeedVCDaemon(
+                device=device,
+                dtype=dtype,
+                compile_model=compile_model,
+                verbose=verbose,
+            )
+            if persistent
+            else None
+        )
+
+    def start(self):
+        """Load the model now instead of on the first job (persistent only)."""
+        if self.daemon:
+            self.daemon.start()
+
+    def stop(self):
+        """Shut down the persistent subprocess, if any."""
+        if self.daemon:
+            self.daemon.stop()
+
     def convert(
         self,
         source_audio: str,
@@ -67,6 +139,7 @@ class SeedVCRunner:
         convert_style: bool = False,
         seed: int = 42,
         timeout: int = 1800,  # 30 minute timeout
+        progress_cb: Optional[Callable[[float], None]] = None,
     ) -> str:
         """
         Convert voice from source to match reference.
@@ -82,86 +155,68 @@ class SeedVCRunner:
             convert_style: Enable accent/emotion conversion
             seed: Random seed (default 42)
             timeout: Timeout in seconds (default 30 minutes)
+            progress_cb: Called with the runner's progress (0-100) as it reports it
 
         Returns:
             Path to converted audio
         """
+        job = {
+            "source": source_audio,
+            "reference": reference_audio,
+            "output": output_path,
+            "diffusion_steps": diffusion_steps,
+            "length_adjust": length_adjust,
+            "intelligibility_cfg_rate": intelligibility_cfg_rate,
+            "similarity_cfg_rate": similarity_cfg_rate,
+            "seed": seed,
+            "convert_style": convert_style,
+            "reference_embedding": (
+                embedding_path(reference_audio, self.embedding_model, "voice")
+                if EMBEDDING_CACHE
+                else None
+            ),
+        }
+
+        if self.daemon:
+            logger.info(f"Running Seed-VC (persistent): {job}")
+            result_data = self.daemon.request(job, timeout, progress_cb)
+            if not result_data.get("success"):
+                raise RuntimeError(f"Seed-VC failed: {result_data.get('error')}")
+            return result_data.get("output", output_path)
+
         # Build command
         cmd = [
             PYTHON_EXECUTABLE,
+            *CHILD_PYARGS,
             self.script_path,
-            "--source",
-            source_audio,
-            "--reference",
-            reference_audio,
-            "--output",
-            output_path,
-            "--diffusion-steps",
-            str(diffusion_steps),
-            "--length-adjust",
-            str(length_adjust),
-            "--intelligibility-cfg-rate",
-            str(intelligibility_cfg_rate),
-            "--similarity-cfg-rate",
-            str(similarity_cfg_rate),
-            "--seed",
-            str(seed),
-            "--device",
-            self.device,
-            "--dtype",
-            self.dtype,
+            *to_cli_args(job),
+            *to_cli_args(_model_options(self.device, self.dtype, self.compile_model)),
         ]
 
-        if convert_style:
-            cmd.append("--convert-style")
-
-        if self.compile_model:
-            cmd.append("--compile")
-
         if not self.verbose:
             cmd.append("--quiet")
 
         logger.info(f"Running Seed-VC: {' '.join(cmd)}")
 
-        # Run subprocess
-        try:
-            result = subprocess.run(
-                cmd,
-                cwd=SEEDVC_REPO_PATH,
-                capture_output=True,
-                text=True,
-                timeout=timeout,
-            )
-
-            if result.returncode != 0:
-                logger.error(f"Seed-VC stderr: {result.stderr}")
-                raise RuntimeError(
-                    f"Seed-VC failed with code {result.returncode}: {result.stderr}"
-                )
-
-            # Parse result from output
-            stdout = result.stdout
-            if self.verbose:
-                print(stdout)
-
-            # Look for JSON result marker
-            if "__RESULT_JSON__:" in stdout:
-                json_str = stdout.split("__RESULT_JSON__:")[-1].strip()
-                # Handle potential extra output after JSON
-                if "\n" in json_str:
-                    json_str = json_str.split("\n")[0]
-                result_data = json.loads(json_str)
-                if result_data.get("success"):
-                    return result_data.get("output", output_path)
-
-            # Fallback: assume success if file exists
-            if os.path.exists(output_path):
-                return output_path
+        # Stream output so progress is visible and memory stays bounded
+        result_data = run_streaming(
+            cmd,
+            cwd=SEEDVC_REPO_PATH,
+            timeout=timeout,
+            progress_cb=progress_cb,
+            verbose=self.verbose,
+            env=gpu_env(),
+            result_fd=RUNNER_RESULT_FD,
+            name="Seed-VC",
+        )
+        if result_data and result_data.get("success"):
+            return result_data.get("output", output_path)
 
-            raise RuntimeError(f"Seed-VC completed but output not found: {output_path}")
+        # Fallback: assume success if file exists
+        if os.path.exists(output_path):
+            return output_path
 
-        except subprocess.TimeoutExpired:
-            raise RuntimeError(f"Seed-VC timed out after {timeout} seconds")
+        raise RuntimeError(f"Seed-VC completed but output not found: {output_path}")
 
 
 def get_seedvc_runner(
@@ -169,6 +224,7 @@ def get_seedvc_runner(
     dtype: str = "fp16",
     compile_model: bool = False,
     verbose: bool = True,
+    persistent: bool = False,
 ) -> SeedVCRunner:
     """
     Create Seed-VC runner instance.
@@ -178,6 +234,7 @@ def get_seedvc_runner(
         dtype=dtype,
         compile_model=compile_model,
         verbose=verbose,
+        persistent=persistent,
     )
 
 
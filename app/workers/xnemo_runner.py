@@ -4,32 +4,85 @@ X-Nemo Runner - Wrapper for X-Nemo video generation.
 Uses subprocess to avoid Python import conflicts between ML repos.
 """
 
-import json
 import logging
 import os
-import subprocess
-from typing import Optional
+from typing import Callable, Optional
 
-logger = logging.getLogger(__name__)
-
-# Configuration - paths relative to project root by default
-PROJECT_ROOT = os.path.dirname(
-    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-)
-XNEMO_REPO_PATH = os.getenv(
-    "XNEMO_REPO_PATH", os.path.join(PROJECT_ROOT, "tools", "x-nemo-inference")
+from app.paths import XNEMO_REPO_PATH, XNEMO_WEIGHTS_PATH
+from app.workers.embedding_cache import (
+    EMBEDDING_CACHE,
+    embedding_path,
+    weights_tag,
 )
-XNEMO_WEIGHTS_PATH = os.getenv(
-    "XNEMO_WEIGHTS_PATH", os.path.join(XNEMO_REPO_PATH, "pretrained_weights")
+from app.workers.gpu import gpu_env
+from app.workers.runner_daemon import (
+    CHILD_PYARGS,
+    RUNNER_RESULT_FD,
+    RunnerDaemon,
+    run_streaming,
+    to_cli_args,
 )
+
+logger = logging.getLogger(__name__)
+
 PYTHON_EXECUTABLE = os.getenv("PYTHON_EXECUTABLE", "python")
+XNEMO_SCRIPT_PATH = os.path.join(XNEMO_REPO_PATH, "run_xnemo.py")
+
+
+def _model_options(pretrained_weights_path: str, device: str, dtype: str) -> dict:
+    """Options that select and load the model (fixed for a daemon's lifetime)."""
+    return {
+        "pretrained_model": os.path.join(
+            pretrained_weights_path, "sd-image-variations-diffusers"
+        ),
+        "vae_path": os.path.join(
+            pretrained_weights_path, "stable-video-diffusion-img2vid-xt/vae"
+        ),
+        "denoising_unet": os.path.join(
+            pretrained_weights_path, "xnemo_denoising_unet.pth"
+        ),
+        "temporal_module": os.path.join(
+            pretrained_weights_path, "xnemo_temporal_module.pth"
+        ),
+        "device": device,
+        "dtype": dtype,
+    }
+
+
+class XNemoDaemon(RunnerDaemon):
+    """X-Nemo kept loaded in a persistent `run_xnemo.py --serve` process."""
+
+    name = "X-Nemo"
+
+    def __init__(
+        self,
+        pretrained_weights_path: str = None,
+        device: str = "cuda",
+        dtype: str = "fp16",
+        verbose: bool = True,
+    ):
+        super().__init__(
+            python_executable=PYTHON_EXECUTABLE,
+            script_path=XNEMO_SCRIPT_PATH,
+            cwd=XNEMO_REPO_PATH,
+            model_options={
+                **_model_options(
+                    pretrained_weights_path or XNEMO_WEIGHTS_PATH, device, dtype
+                ),
+                "quiet": not verbose,
+            },
+            verbose=verbose,
+            env=gpu_env(),
+        )
 
 
 class XNemoRunner:
     """
     Wrapper for X-Nemo video generation.
 
-    Runs X-Nemo as a subprocess to avoid import conflicts.
+    Runs X-Nemo as a subprocess to avoid import conflicts. With
+    persistent=True the subprocess is kept alive between calls so the
+    weights are only loaded once.
     """
 
     def __init__(
@@ -38,6 +91,7 @@ class XNemoRunner:
         device: str = "cuda",
         dtype: str = "fp16",
         verbose: bool = True,
+        persistent: bool = False,
     ):
         """
         Initialize X-Nemo runner.
@@ -47,18 +101,51 @@ class XNemoRunner:
             device: Device to use ("cuda" or "cpu")
             dtype: Data type ("fp16", "bf16", or "fp32")
             verbose: Print progress messages
+            persistent: Keep the model loaded in a daemon subprocess
         """
         self.device = device
         self.dtype = dtype
         self.verbose = verbose
         self.pretrained_weights_path = pretrained_weights_path or XNEMO_WEIGHTS_PATH
-        self.script_path = os.path.join(XNEMO_REPO_PATH, "run_xnemo.py")
+        self.script_path = XNEMO_SCRIPT_PATH
 
         if not os.path.exists(self.script_path):
             raise FileNotFoundError(
                 f"X-Nemo runner script not found: {self.script_path}"
             )
 
+        # The face embedding comes from the image encoder + reference UNet
+        self.embedding_model = weights_tag(
+            "x-nemo",
+            os.path.join(
+                self.pretrained_weights_path,
+                "sd-image-variations-diffusers",
+                "image_encoder",
+            ),
+            os.path.join(self.pretrained_weights_path, "xnemo_reference_unet.pth"),
+        )
+
+        self.daemon = (
+            XNemoDaemon(
+                pretrained_weights_path=self.pretrained_weights_path,
+                device=device,
+                dtype=dtype,
+                verbose=verbose,
+            )
+            if persistent
+            else None
+        )
+
+    def start(self):
+        """Load the model now instead of on the first job (persistent only)."""
+        if self.daemon:
+            self.daemon.start()
+
+    def stop(self):
+        """Shut down the persistent subprocess, if any."""
+        if self.daemon:
+            self.daemon.stop()
+
     def generate(
         self,
         source_video: str,
@@ -71,6 +158,7 @@ class XNemoRunner:
         seed: int = 42,
         max_frames: Optional[int] = None,
         timeout: int = 1800,  # 30 minute timeout
+        progress_cb: Optional[Callable[[float], None]] = None,
     ) -> str:
         """
         Generate a reenacted video.
@@ -87,93 +175,70 @@ class XNemoRunner:
             seed: Random seed (default 42)
             max_frames: Max frames to process (None = all)
             timeout: Timeout in seconds (default 30 minutes)
+            progress_cb: Called with the runner's progress (0-100) as it reports it
 
         Returns:
             Path to generated video
         """
+        job = {
+            "source": source_video,
+            "reference": identity_image,
+            "output": output_path,
+            "width": width,
+            "height": height,
+            "steps": steps,
+            "guidance": guidance_scale,
+            "seed": seed,
+            "max_frames": max_frames,
+            "reference_embedding": (
+                embedding_path(identity_image, self.embedding_model, "face")
+                if EMBEDDING_CACHE
+                else None
+            ),
+        }
+
+        if self.daemon:
+            logger.info(f"Running X-Nemo (persistent): {job}")
+            result_data = self.daemon.request(job, timeout, progress_cb)
+            if not result_data.get("success"):
+                raise RuntimeError(f"X-Nemo failed: {result_data.get('error')}")
+            return result_data.get("output", output_path)
+
         # Build command
         cmd = [
             PYTHON_EXECUTABLE,
+            *CHILD_PYARGS,
             self.script_path,
-            "--source",
-            source_video,
-            "--reference",
-            identity_image,
-            "--output",
-            output_path,
-            "--pretrained-model",
-            os.path.join(self.pretrained_weights_path, "sd-image-variations-diffusers"),
-            "--vae-path",
-            os.path.join(
-                self.pretrained_weights_path, "stable-video-diffusion-img2vid-xt/vae"
+            *to_cli_args(job),
+            *to_cli_args(
+                _model_options(self.pretrained_weights_path, self.device, self.dtype)
             ),
-            "--denoising-unet",
-            os.path.join(self.pretrained_weights_path, "xnemo_denoising_unet.pth"),
-            "--temporal-module",
-            os.path.join(self.pretrained_weights_path, "xnemo_temporal_module.pth"),
-            "--width",
-            str(width),
-            "--height",
-            str(height),
-            "--steps",
-            str(steps),
-            "--guidance",
-            str(guidance_scale),
-            "--seed",
-            str(seed),
-            "--device",
-            self.device,
-            "--dtype",
-            self.dtype,
         ]
 
-        if max_frames is not None:
-            cmd.extend(["--max-frames", str(max_frames)])
-
         if not self.verbose:
             cmd.append("--quiet")
 
         logger.info(f"Running X-Nemo: {' '.join(cmd)}")
 
-        # Run subprocess
-        try:
-            result = subprocess.run(
-                cmd,
-                cwd=XNEMO_REPO_PATH,
-                capture_output=True,
-                text=True,
-                timeout=timeout,
-            )
-
-            if result.returncode != 0:
-                logger.error(f"X-Nemo stderr: {result.stderr}")
-                raise RuntimeError(
-                    f"X-Nemo failed with code {result.returncode}: {result.stderr}"
-                )
-
-            # Parse result from output
-            stdout = result.stdout
-            if self.verbose:
-                print(stdout)
-
-            # Look for JSON result marker
-            if "__RESULT_JSON__:" in stdout:
-                json_str = stdout.split("__RESULT_JSON__:")[-1].strip()
-                # Handle potential extra output after JSON
-                if "\n" in json_str:
-                    json_str = json_str.split("\n")[0]
-                result_data = json.loads(json_str)
-                if result_data.get("success"):
-                    return result_data.get("output", output_path)
-
-            # Fallback: assume success if file exists
-            if os.path.exists(output_path):
-                return output_path
+        # Stream output so progress is visible and memory stays bounded
+        result_data = run_streaming(
+            cmd,
+            cwd=XNEMO_REPO_PATH,
+            timeout=timeout,
+            progress_cb=progress_cb,
+            verbose=self.verbose,
+            env=gpu_env(),
+            result_fd=RUNNER_RESULT_FD,
+            name="X-Nemo",
+        )
+        if result_data and result_data.get("success"):
+            return result_data.get("output", output_path)
 
-            raise RuntimeError(f"X-Nemo completed but output not found: {output_path}")
+        # Fallback: assume success if file exists
+        if os.path.exists(output_path):
+            return output_path
 
-        except subprocess.TimeoutExpired:
-            raise RuntimeError(f"X-Nemo timed out after {timeout} seconds")
+        raise RuntimeError(f"X-Nemo completed but output not found: {output_path}")
 
 
 def get_xnemo_runner(
@@ -181,6 +246,7 @@ def get_xnemo_runner(
     device: str = "cuda",
     dtype: str = "fp16",
     verbose: bool = True,
+    persistent: bool = False,
 ) -> XNemoRunner:
     """
     Create X-Nemo runner instance.
@@ -190,6 +256,7 @@ def get_xnemo_runner(
         device=device,
         dtype=dtype,
         verbose=verbose,
+        persistent=persistent,
     )
 
 
@@ -3,33 +3,403 @@
 Download all required pretrained weights for the Fred pipeline.
 
 Usage:
-    python scripts/download_weights.py
+    python scripts/download_weights.py [--fast]
 
 This will download:
     - X-NeMo weights (denoising unet, reference unet, motion encoder, temporal module)
-    - Stable Diffusion Image Variations
+    - Stable Diffusion Image Variations (UNet, image encoder, scheduler)
     - Stable Video Diffusion VAE
+
+Only the files listed in NEEDED_FILES are fetched, not the whole repos.
+
+Repos served from Xet storage download through hf_xet, which fetches
+content-addressed chunks in parallel, so re-downloads only transfer
+changed chunks. It ships with huggingface_hub and is used automatically;
+--fast installs it if it is missing. Its per-file parallelism is set with
+HF_XET_NUM_CONCURRENT_RANGE_GETS (default here: 16).
+
+With --mirror s3://bucket/path (or FRED_WEIGHTS_S3_MIRROR) the weights
+directory is first copied from an S3 mirror with s5cmd, which is much
+faster than the Hub when many nodes download at once. Anything the mirror
+lacks is then fetched from the Hub as usual.
+
+Set FRED_DOWNLOAD_CACHE to a persistent directory (e.g. a Docker build
+cache mount) to download into a Hugging Face cache there and hard-link
+(or copy, across filesystems) the files into pretrained_weights, so
+rebuilds reuse earlier downloads.
 """
 
 import argparse
+import fnmatch
+import hashlib
+import importlib.util
+import json
 import os
+import shutil
+import signal
+import stat
+import subprocess
 import sys
+import threading
+from concurrent.futures import CancelledError, ThreadPoolExecutor, as_completed
 
-# Add project root to path
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-sys.path.insert(0, PROJECT_ROOT)
 
+# Persistent download cache; huggingface_hub reads HF_HUB_CACHE on import
+DOWNLOAD_CACHE = os.environ.get("FRED_DOWNLOAD_CACHE")
+if DOWNLOAD_CACHE:
+    os.environ.setdefault("HF_HUB_CACHE", DOWNLOAD_CACHE)
 
-def download_weights(xnemo_repo_path: str, force: bool = False):
-    """Download all required weights."""
+# Checked without importing: the hf_xet settings must be in the environment
+# before the first huggingface_hub import
+if importlib.util.find_spec("huggingface_hub") is None:
+    print("Installing huggingface_hub...")
+    subprocess.check_call(
+        [sys.executable, "-m", "pip", "install", "-q", "huggingface_hub"]
+    )
+
+
+# Files fetched in parallel within each repo (UNet shards, VAE, configs...)
+DEFAULT_WORKERS = int(os.environ.get("FRED_HF_WORKERS", "8"))
+
+
+# Files the X-NeMo pipeline loads from each repo; everything else (full
+# checkpoints, safety checker, the SVD UNet...) is never downloaded
+NEEDED_FILES = {
+    "lambdalabs/sd-image-variations-diffusers": [
+        "model_index.json",
+        "feature_extractor/*",
+        "image_encoder/*",
+        "scheduler/*",
+        "unet/*",
+    ],
+    # Only the VAE (~200 MB) of the ~40 GB SVD repo is used
+    "stabilityai/stable-video-diffusion-img2vid-xt": ["model_index.json", "vae/*"],
+}
+
+# Set on Ctrl+C: per-file pools drop queued files and retries stop
+_STOP = threading.Event()
+_FILE_POOLS = set()
+
+# Parallel S3 transfers for s5cmd when copying from a mirror
+MIRROR_WORKERS = 32
+
+# Retries for network errors; waits 1s, 2s, 4s, ... between attempts
+MAX_RETRIES = 5
+
+# Checksums of verified files, so unchanged files are never hashed twice
+CHECKSUM_CACHE = os.path.expanduser("~/.cache/fred/checksums/checksums.json")
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def _link_or_copy(src: str, dst: str):
+    """Hard-link src to dst, copying instead if they are on different filesystems."""
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    tmp = f"{dst}.tmp"
+    if os.path.lexists(tmp):
+        os.remove(tmp)
+    try:
+        os.link(os.path.realpath(src), tmp)
+    except OSError:
+        shutil.copyfile(src, tmp)
+    os.replace(tmp, dst)
+
+
+def _file_progress(shared, size: int):
+    """
+    A tqdm class for hf_hub_download that feeds one file's bytes into the
+    shared bar instead of drawing its own.
+
+    The hub may create several bars for one file: one per retry (starting
+    at the resumed size), and two at once for Xet downloads (reconstruction
+    and transfer). The file therefore reports the furthest any of its bars
+    got, capped at its size, so no byte is counted twice.
+    """
+    from tqdm.auto import tqdm
+
+    lock = threading.Lock()
+
+    class FileProgress(tqdm):
+        reported = 0
+
+        def __init__(self, *args, **kwargs):
+            kwargs["disable"] = True
+            super().__init__(*args, **kwargs)
+            self.done = kwargs.get("initial") or 0
+            self._report()
 
+        def update(self, n=1):
+            self.done += n
+            self._report()
+
+        def _report(self):
+            with lock:
+                delta = min(self.done, size) - FileProgress.reported
+                if delta > 0:
+                    FileProgress.reported += delta
+                    shared.update(delta)
+
+    return FileProgress
+
+
+def _download_file(repo_id: str, filename: str, local_dir: str, tqdm_class=None):
+    """
+    Download one file from a Hugging Face repo. Returns None or the error.
+
+    Interrupted files are resumed from their partial .incomplete download,
+    so a retry only fetches the missing bytes.
+    """
+    from huggingface_hub import hf_hub_download
+    from huggingface_hub.utils import (
+        EntryNotFoundError,
+        GatedRepoError,
+        RepositoryNotFoundError,
+        RevisionNotFoundError,
+    )
+
+    for attempt in range(1, MAX_RETRIES + 1):
+        if _STOP.is_set():
+            return KeyboardInterrupt("cancelled")
+        try:
+            # Only called for files that are missing or differ from the Hub;
+            # an existing one (and its cache blob, which a hard link shares)
+            # must not be trusted from its metadata
+            dest = os.path.join(local_dir, filename)
+            if DOWNLOAD_CACHE:
+                cached = hf_hub_download(
+                    repo_id=repo_id,
+                    filename=filename,
+                    tqdm_class=tqdm_class,
+                    force_download=os.path.lexists(dest),
+                )
+                _link_or_copy(cached, dest)
+            else:
+                hf_hub_download(
+                    repo_id=repo_id,
+                    filename=filename,
+                    local_dir=local_dir,
+                    tqdm_class=tqdm_class,
+                    force_download=os.path.lexists(dest),
+                )
+            return None
+        except (
+            EntryNotFoundError,
+            GatedRepoError,
+            RepositoryNotFoundError,
+            RevisionNotFoundError,
+        ) as e:
+            # Retrying won't help with these
+            return e
+        except Exception as e:
+            if attempt == MAX_RETRIES:
+                return e
+            delay = 2 ** (attempt - 1)
+            print(
+                f"      {repo_id}/{filename}: attempt {attempt}/{MAX_RETRIES} "
+                f"failed ({e}), retrying in {delay}s",
+                file=sys.stderr,
+            )
+            _STOP.wait(delay)
+
+
+def _download_repo(
+    repo_id: str,
+    local_dir: str,
+    files: dict,
+    progress,
+    max_workers: int = DEFAULT_WORKERS,
+):
+    """
+    Download the given {filename: size} files of a repo. Returns (repo_id, ok).
+
+    Files are fetched in parallel and every byte received is added to the
+    shared progress bar as it arrives, so the bar's ETA covers all repos.
+    """
+    failed = []
+    file_bars = {
+        filename: _file_progress(progress, size) for filename, size in files.items()
+    }
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        # Registered so Ctrl+C can cancel the queued files right away
+        _FILE_POOLS.add(pool)
+        futures = {
+            pool.submit(
+                _download_file, repo_id, filename, local_dir, file_bars[filename]
+            ): filename
+            for filename in files
+        }
+        if _STOP.is_set():
+            pool.shutdown(wait=False, cancel_futures=True)
+        # Not as_completed(): it never wakes for futures cancelled by
+        # shutdown(cancel_futures=True), while result() does
+        for future, filename in futures.items():
+            try:
+                error = future.result()
+            except CancelledError:
+                failed.append(filename)
+                continue
+            if error:
+                failed.append(filename)
+                progress.write(f"      ✗ {repo_id}/{filename} failed: {error}")
+            else:
+                # Files already up to date locally report no bytes
+                progress.update(max(files[filename] - file_bars[filename].reported, 0))
+    _FILE_POOLS.discard(pool)
+    return repo_id, not failed
+
+
+def _copy_from_mirror(mirror: str, weights_dir: str, force: bool = False) -> bool:
+    """
+    Copy the weights directory from an S3 mirror with s5cmd.
+
+    Files whose size already matches are skipped unless force is set.
+    Returns False if s5cmd is missing or the copy failed.
+    """
+    if shutil.which("s5cmd") is None:
+        print("      ⚠ s5cmd not found, skipping mirror")
+        return False
+    cmd = ["s5cmd", "--numworkers", str(MIRROR_WORKERS), "cp"]
+    if not force:
+        cmd.append("--if-size-differ")
+    cmd += [f"{mirror.rstrip('/')}/*", weights_dir.rstrip("/") + "/"]
+    if subprocess.run(cmd).returncode != 0:
+        print("      ⚠ Mirror copy failed, falling back to Hugging Face")
+        return False
+    return True
+
+
+def _load_checksum_cache() -> dict:
     try:
-        from huggingface_hub import hf_hub_download, snapshot_download
-    except ImportError:
-        print("Installing huggingface_hub...")
-        os.system(f"{sys.executable} -m pip install huggingface_hub")
-        from huggingface_hub import snapshot_download
+        with open(CHECKSUM_CACHE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_checksum_cache(cache: dict):
+    os.makedirs(os.path.dirname(CHECKSUM_CACHE), exist_ok=True)
+    tmp = f"{CHECKSUM_CACHE}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(cache, f)
+    os.replace(tmp, CHECKSUM_CACHE)
+
+
+def _cached_checksum(path: str, cache: dict, st: os.stat_result = None) -> str:
+    """
+    SHA-256 of a file, rehashed only if its mtime or size changed.
+
+    Entries are keyed by the hash of the absolute path and hold
+    {mtime, size, sha256}. SHA-256 rather than MD5 so the digest can be
+    compared directly with the LFS hashes Hugging Face publishes. Pass st
+    if the file was just stat'ed to skip another stat.
+    """
+    path = os.path.abspath(path)
+    key = hashlib.sha256(path.encode()).hexdigest()
+    st = st or os.stat(path)
+    entry = cache.get(key)
+    if entry and entry["mtime"] == st.st_mtime_ns and entry["size"] == st.st_size:
+        return entry["sha256"]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(HASH_BLOCK_SIZE):
+            digest.update(block)
+    cache[key] = {
+        "mtime": st.st_mtime_ns,
+        "size": st.st_size,
+        "sha256": digest.hexdigest(),
+    }
+    return cache[key]["sha256"]
+
+
+def _remote_manifest(repo_id: str) -> dict:
+    """
+    {filename: (size, sha256)} for the NEEDED_FILES of a repo.
 
+    sha256 is None for non-LFS files. Returns {} if the Hub can't be
+    reached, so verification falls back to existence checks offline.
+    """
+    from huggingface_hub import HfApi
+
+    try:
+        info = HfApi().model_info(repo_id, files_metadata=True)
+    except Exception as e:
+        print(f"      ⚠ Could not fetch file list for {repo_id}: {e}")
+        return {}
+    patterns = NEEDED_FILES.get(repo_id, ["*"])
+    return {
+        s.rfilename: (s.size, s.lfs.sha256 if s.lfs else None)
+        for s in info.siblings
+        if any(fnmatch.fnmatch(s.rfilename, pattern) for pattern in patterns)
+    }
+
+
+def _verify_with_cache(
+    path: str,
+    cache: dict,
+    expected_size: int = None,
+    expected_sha256: str = None,
+) -> bool:
+    """Check that a file exists and matches the expected size and hash."""
+    # One stat serves the existence, size and checksum-cache checks
+    try:
+        st = os.stat(path)
+    except OSError:
+        return False
+    if not stat.S_ISREG(st.st_mode):
+        return False
+    if expected_size is not None and st.st_size != expected_size:
+        return False
+    if expected_sha256 is not None:
+        return _cached_checksum(path, cache, st) == expected_sha256
+    return True
+
+
+def _ensure_package(name: str, install: bool) -> bool:
+    """True if a package is importable, pip installing it first if allowed."""
+    if importlib.util.find_spec(name) is not None:
+        return True
+    if not install:
+        return False
+    print(f"Installing {name}...")
+    install_cmd = [sys.executable, "-m", "pip", "install", "-q", name]
+    if subprocess.run(install_cmd).returncode != 0:
+        print(f"      ⚠ Could not install {name}, using default downloader")
+        return False
+    return True
+
+
+def _needs_refresh(
+    local_path: str, size: int, sha256: str = None, cache: dict = None
+) -> bool:
+    """True if a file is missing or doesn't match the Hub's size (and hash)."""
+    cache = cache if cache is not None else {}
+    return not _verify_with_cache(local_path, cache, size, sha256)
+
+
+def enable_xet(install: bool = False) -> bool:
+    """
+    Let huggingface_hub use hf_xet for repos stored on Xet.
+
+    Must run before huggingface_hub is imported, which reads its settings
+    once at import time.
+
+    Returns:
+        True if hf_xet is installed (HF_HUB_DISABLE_XET can still turn it off)
+    """
+    if not _ensure_package("hf_xet", install):
+        return False
+    os.environ.setdefault("HF_XET_NUM_CONCURRENT_RANGE_GETS", "16")
+    return True
+
+
+def download_weights(
+    xnemo_repo_path: str,
+    force: bool = False,
+    workers: int = DEFAULT_WORKERS,
+    mirror: str = None,
+):
+    """Download all required weights."""
     weights_dir = os.path.join(xnemo_repo_path, "pretrained_weights")
     os.makedirs(weights_dir, exist_ok=True)
 
@@ -39,31 +409,107 @@ def download_weights(xnemo_repo_path: str, force: bool = False):
     print(f"Target directory: {weights_dir}")
     print()
 
-    # 1. Download SD Image Variations
+    # Mirror first; the Hub checks below then only find what it lacked
+    if mirror:
+        print(f"Copying weights from mirror {mirror}...")
+        _copy_from_mirror(mirror, weights_dir, force)
+        print()
+
+    # 1-2. Download SD Image Variations and Stable Video Diffusion (for VAE).
+    # Independent repos, so both download at the same time.
     sd_variations_path = os.path.join(weights_dir, "sd-image-variations-diffusers")
-    if not os.path.exists(sd_variations_path) or force:
-        print("[1/4] Downloading SD Image Variations from lambdalabs...")
-        snapshot_download(
-            repo_id="lambdalabs/sd-image-variations-diffusers",
-            local_dir=sd_variations_path,
-            local_dir_use_symlinks=False,
+    svd_path = os.path.join(weights_dir, "stable-video-diffusion-img2vid-xt")
+    repos = [
+        (
+            "[1/4]",
+            "SD Image Variations",
+            "lambdalabs/sd-image-variations-diffusers",
+            sd_variations_path,
+        ),
+        (
+            "[2/4]",
+            "Stable Video Diffusion",
+            "stabilityai/stable-video-diffusion-img2vid-xt",
+            svd_path,
+        ),
+    ]
+
+    # Compare against the Hub's file list so a half-downloaded repo only
+    # fetches what is missing. Offline, fall back to the directory check.
+    manifests = {repo_id: _remote_manifest(repo_id) for _, _, repo_id, _ in repos}
+    checksums = _load_checksum_cache()
+
+    tasks = []
+    for step, name, repo_id, local_dir in repos:
+        manifest = manifests[repo_id]
+        if not manifest:
+            if os.path.exists(local_dir):
+                print(f"{step} {name} already exists, skipping...")
+            else:
+                print(f"{step} ✗ Cannot list {name} files, skipping...")
+            continue
+
+        # Sizes are enough to find missing files; --force also compares
+        # hashes so exactly the files that drifted from the Hub are fetched
+        missing = {
+            filename: size
+            for filename, (size, sha256) in manifest.items()
+            if _needs_refresh(
+                os.path.join(local_dir, filename),
+                size,
+                sha256 if force else None,
+                checksums,
+            )
+        }
+        if not missing:
+            print(f"{step} {name} already complete, skipping...")
+            continue
+        print(
+            f"{step} Downloading {len(missing)}/{len(manifest)} {name} files "
+            f"from {repo_id.split('/')[0]}..."
         )
-        print("      ✓ Done")
-    else:
-        print("[1/4] SD Image Variations already exists, skipping...")
+        tasks.append((repo_id, local_dir, missing))
 
-    # 2. Download Stable Video Diffusion (for VAE)
-    svd_path = os.path.join(weights_dir, "stable-video-diffusion-img2vid-xt")
-    if not os.path.exists(svd_path) or force:
-        print("[2/4] Downloading Stable Video Diffusion from stabilityai...")
-        snapshot_download(
-            repo_id="stabilityai/stable-video-diffusion-img2vid-xt",
-            local_dir=svd_path,
-            local_dir_use_symlinks=False,
+    if tasks:
+        from huggingface_hub.utils import disable_progress_bars
+        from tqdm.auto import tqdm
+
+        # One bar with a real ETA for everything instead of a bar per file;
+        # total bytes come from the Hub manifests
+        disable_progress_bars()
+        progress = tqdm(
+            total=sum(sum(files.values()) for _, _, files in tasks),
+            unit="B",
+            unit_scale=True,
+            unit_divisor=1024,
         )
-        print("      ✓ Done")
-    else:
-        print("[2/4] Stable Video Diffusion already exists, skipping...")
+        executor = ThreadPoolExecutor(max_workers=len(tasks))
+        previous_handler = signal.getsignal(signal.SIGINT)
+
+        def _cancel(signum, frame):
+            # Drop downloads that haven't started, then stop as usual.
+            # Files already transferring finish; nothing new is started.
+            _STOP.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+            for pool in list(_FILE_POOLS):
+                pool.shutdown(wait=False, cancel_futures=True)
+            signal.signal(signal.SIGINT, previous_handler)
+            raise KeyboardInterrupt
+
+        signal.signal(signal.SIGINT, _cancel)
+        try:
+            futures = [
+                executor.submit(_download_repo, *task, progress, workers)
+                for task in tasks
+            ]
+            for future in as_completed(futures):
+                repo_id, ok = future.result()
+                if ok:
+                    progress.write(f"      ✓ {repo_id} done")
+        finally:
+            signal.signal(signal.SIGINT, previous_handler)
+            executor.shutdown(wait=False)
+            progress.close()
 
     # 3. Download X-NeMo weights from the X-NeMo repo or a mirror
     xnemo_weights = [
@@ -103,20 +549,35 @@ def download_weights(xnemo_repo_path: str, force: bool = False):
     print("[4/4] Verifying installation...")
     all_good = True
 
-    checks = [
-        (sd_variations_path, "SD Image Variations"),
-        (os.path.join(svd_path, "vae"), "SVD VAE"),
-    ]
-    for weight_file in xnemo_weights:
-        checks.append((os.path.join(weights_dir, weight_file), weight_file))
+    # Hugging Face repos: every file against the Hub's size and LFS hash.
+    # Unchanged files hit the checksum cache, so re-runs don't rehash GBs.
+    for _, name, repo_id, local_dir in repos:
+        manifest = manifests[repo_id]
+        if manifest:
+            bad = [
+                filename
+                for filename, (size, sha256) in manifest.items()
+                if not _verify_with_cache(
+                    os.path.join(local_dir, filename), checksums, size, sha256
+                )
+            ]
+        else:
+            bad = [] if os.path.exists(local_dir) else [local_dir]
+        print(f"      {'✗' if bad else '✓'} {name}")
+        for filename in bad:
+            print(f"          missing or corrupt: {filename}")
+        if bad:
+            all_good = False
 
-    for path, name in checks:
-        exists = os.path.exists(path)
-        status = "✓" if exists else "✗"
-        print(f"      {status} {name}")
-        if not exists:
+    # X-NeMo weights have no published manifest, only check they are there
+    for weight_file in xnemo_weights:
+        ok = _verify_with_cache(os.path.join(weights_dir, weight_file), checksums)
+        print(f"      {'✓' if ok else '✗'} {weight_file}")
+        if not ok:
             all_good = False
 
+    _save_checksum_cache(checksums)
+
     print()
     print("=" * 60)
     if all_good:
@@ -138,7 +599,24 @@ def main():
     parser.add_argument(
         "--force",
         action="store_true",
-        help="Re-download even if files exist",
+        help="Re-download files whose contents differ from the Hub (checks hashes)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help="Parallel file downloads per repo (default: $FRED_HF_WORKERS or 8)",
+    )
+    parser.add_argument(
+        "--fast",
+        action="store_true",
+        help="Install hf_xet if missing, for faster chunked downloads",
+    )
+    parser.add_argument(
+        "--mirror",
+        default=os.environ.get("FRED_WEIGHTS_S3_MIRROR"),
+        help="S3 mirror of the weights directory, copied with s5cmd first "
+        "(default: $FRED_WEIGHTS_S3_MIRROR)",
     )
     args = parser.parse_args()
 
@@ -152,7 +630,13 @@ def main():
         print(f"  git clone https://github.com/samarrik/x-nemo-inference {xnemo_path}")
         sys.exit(1)
 
-    success = download_weights(xnemo_path, args.force)
+    if enable_xet(install=args.fast):
+        from huggingface_hub import constants
+
+        if not constants.HF_HUB_DISABLE_XET:
+            print("Using hf_xet for Xet-backed repos")
+
+    success = download_weights(xnemo_path, args.force, args.workers, args.mirror)
     sys.exit(0 if success else 1)
 
 
@@ -5,20 +5,97 @@ Verify that all components of the Fred pipeline are correctly set up.
 Run with: python scripts/verify_setup.py
 """
 
+import importlib
+import importlib.util
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
-# Add project root to path
+# Add project root to path, unless the project is installed (pip install -e .)
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-sys.path.insert(0, PROJECT_ROOT)
+if importlib.util.find_spec("app") is None:
+    sys.path.insert(0, PROJECT_ROOT)
+
+SHARED_SUBDIRS = ("uploads", "temp", "output")
+
+# (module, attribute, label) checked in the imports step
+IMPORTS = [
+    ("app.workers.xnemo_runner", "XNemoRunner", "XNemoRunner"),
+    ("app.workers.seedvc_runner", "SeedVCRunner", "SeedVCRunner"),
+    ("app.db.models", "Job", "Database models"),
+]
+
+
+def _index(root: str) -> dict:
+    """
+    All paths under root (files, directories and symlinks) in one walk.
+
+    Maps each normalized path to its os.DirEntry. Lookups in the index
+    replace one stat per checked path, which adds up on network
+    filesystems, and an entry's stat() is only fetched (once) if a caller
+    needs it. Hidden directories such as .git are not descended into.
+    """
+    entries = {}
+    if not os.path.isdir(root):
+        return entries
+    entries[os.path.normpath(root)] = os.stat(root)
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                entries[os.path.normpath(entry.path)] = entry
+                hidden = entry.name.startswith(".")
+                if not hidden and entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+    return entries
+
+
+def _verify_size(info, expected: int = None) -> bool:
+    """
+    Check a file's size from check_path()'s result without another lookup.
+
+    Without an expected size, only empty files (e.g. an aborted copy) fail.
+    """
+    try:
+        st = info.stat() if isinstance(info, os.DirEntry) else info
+    except OSError:
+        # Dangling symlink
+        return False
+    if st is None:
+        return False
+    if expected is None:
+        return st.st_size > 0
+    return st.st_size == expected
+
+
+def _try_import(module: str, attribute: str):
+    """Import module.attribute. Returns None or the exception."""
+    try:
+        getattr(importlib.import_module(module), attribute)
+    except Exception as e:
+        return e
+    return None
+
 
+def check_path(path: str, description: str, index: dict = None):
+    """Check if a path exists (a symlink counts even if it is dangling).
 
-def check_path(path: str, description: str) -> bool:
-    """Check if a path exists."""
-    exists = os.path.exists(path)
-    status = "✓" if exists else "✗"
+    With an index from _index() the check is a dict lookup instead of a stat.
+
+    Returns:
+        The path's os.DirEntry (with an index) or os.stat_result, or None if
+        it doesn't exist - pass it to _verify_size() instead of re-stating
+    """
+    if index is None:
+        try:
+            info = os.lstat(path)
+        except OSError:
+            info = None
+    else:
+        info = index.get(os.path.normpath(path))
+    status = "✓" if info is not None else "✗"
     print(f"  {status} {description}: {path}")
-    return exists
+    return info
 
 
 def main():
@@ -47,6 +124,18 @@ def main():
 
     print(f"\nProject root: {PROJECT_ROOT}")
 
+    # One directory walk per tree instead of a stat per checked path
+    xnemo_index = _index(XNEMO_REPO_PATH)
+    weights_index = (
+        xnemo_index
+        if os.path.normpath(XNEMO_WEIGHTS_PATH).startswith(
+            os.path.normpath(XNEMO_REPO_PATH) + os.sep
+        )
+        else _index(XNEMO_WEIGHTS_PATH)
+    )
+    seedvc_index = _index(SEEDVC_REPO_PATH)
+    identities_index = _index(IDENTITIES_PATH)
+
     print("\n[1] X-Nemo Repository")
     print("-" * 40)
 
@@ -67,7 +156,7 @@ def main():
     ]
 
     for path, desc in xnemo_checks:
-        if not check_path(path, desc):
+        if not check_path(path, desc, xnemo_index):
             errors.append(f"X-Nemo: {desc} not found")
 
     print("\n[2] X-Nemo Pretrained Weights")
@@ -76,8 +165,14 @@ def main():
     weights_checks = [
         (XNEMO_WEIGHTS_PATH, "Weights directory"),
         (
-            os.path.join(XNEMO_WEIGHTS_PATH, "sd-image-variations-diffusers"),
-            "SD image variations",
+            os.path.join(XNEMO_WEIGHTS_PATH, "sd-image-variations-diffusers/unet"),
+            "SD image variations UNet",
+        ),
+        (
+            os.path.join(
+                XNEMO_WEIGHTS_PATH, "sd-image-variations-diffusers/image_encoder"
+            ),
+            "SD image variations image encoder",
         ),
         (
             os.path.join(XNEMO_WEIGHTS_PATH, "stable-video-diffusion-img2vid-xt/vae"),
@@ -102,8 +197,12 @@ def main():
     ]
 
     for path, desc in weights_checks:
-        if not check_path(path, desc):
+        info = check_path(path, desc, weights_index)
+        if info is None:
             errors.append(f"X-Nemo weights: {desc} not found")
+        elif path.endswith(".pth") and not _verify_size(info):
+            print(f"    ⚠ {desc} is empty")
+            errors.append(f"X-Nemo weights: {desc} is empty")
 
     print("\n[3] Seed-VC Repository")
     print("-" * 40)
@@ -117,66 +216,73 @@ def main():
     ]
 
     for path, desc in seedvc_checks:
-        if not check_path(path, desc):
+        if not check_path(path, desc, seedvc_index):
             errors.append(f"Seed-VC: {desc} not found")
 
     print("\n[4] Shared Data Directories")
     print("-" * 40)
 
-    for subdir in ["uploads", "temp", "output"]:
+    # makedirs is idempotent and raises if a directory can't be there,
+    # so no separate existence check is needed
+    for subdir in SHARED_SUBDIRS:
         path = os.path.join(SHARED_DATA_PATH, subdir)
-        if not os.path.exists(path):
+        try:
             os.makedirs(path, exist_ok=True)
-            print(f"  + Created: {path}")
-        else:
-            check_path(path, subdir)
+            print(f"  ✓ {subdir}: {path}")
+        except OSError as e:
+            print(f"  ✗ {subdir}: {path} ({e})")
+            errors.append(f"Shared data: cannot create {path}")
 
     print("\n[5] Identity Assets")
     print("-" * 40)
 
-    check_path(IDENTITIES_PATH, "Identities directory")
+    check_path(IDENTITIES_PATH, "Identities directory", identities_index)
 
-    # Check identity structure
-    from app.core.identities import IDENTITIES
+    # Check identity structure. Imported here, after the plain path checks,
+    # so a broken environment still gets sections [1]-[4] reported first.
+    try:
+        from app.core.identities import IDENTITIES
+    except ImportError as e:
+        print(f"  ✗ Cannot load identities: {e}")
+        errors.append(f"Import error: app.core.identities - {e}")
+        IDENTITIES = None
 
-    if not IDENTITIES:
+    if IDENTITIES == {}:
         print("  ⚠ No identities found!")
         print("    Add folders with face images + voice audio to:")
         print(f"    {IDENTITIES_PATH}/")
-    else:
-        for identity_id, data in IDENTITIES.items():
-            identity_dir = os.path.join(IDENTITIES_PATH, identity_id)
-            check_path(identity_dir, f"Identity: {data['name']}")
-
-            # Check images
-            for img in data["images"]:
-                img_path = os.path.join(identity_dir, img)
-                check_path(img_path, f"  Image: {img}")
-
-            # Check audio
-            audio_path = os.path.join(identity_dir, data["audio"])
-            check_path(audio_path, f"  Audio: {data['audio']}")
+    elif IDENTITIES:
+        # Every expected path (folder, images, audio) in display order,
+        # then one pass of lookups against the index
+        expected = [
+            entry
+            for identity_id, data in IDENTITIES.items()
+            for entry in (
+                (identity_id, f"Identity: {data['name']}"),
+                *(
+                    (f"{identity_id}/{img}", f"  Image: {img}")
+                    for img in data["images"]
+                ),
+                (f"{identity_id}/{data['audio']}", f"  Audio: {data['audio']}"),
+            )
+        ]
+        for rel_path, desc in expected:
+            check_path(os.path.join(IDENTITIES_PATH, rel_path), desc, identities_index)
 
     print("\n[6] Python Imports")
     print("-" * 40)
 
-    try:
-        print("  ✓ XNemoRunner import OK")
-    except Exception as e:
-        print(f"  ✗ XNemoRunner import failed: {e}")
-        errors.append(f"Import error: XNemoRunner - {e}")
+    # Imports run concurrently; extension loading and file reads release
+    # the GIL, so cold imports take about as long as the slowest one
+    with ThreadPoolExecutor(max_workers=len(IMPORTS)) as pool:
+        results = list(pool.map(lambda entry: _try_import(*entry[:2]), IMPORTS))
 
-    try:
-        print("  ✓ SeedVCRunner import OK")
-    except Exception as e:
-        print(f"  ✗ SeedVCRunner import failed: {e}")
-        errors.append(f"Import error: SeedVCRunner - {e}")
-
-    try:
-        print("  ✓ Database models import OK")
-    except Exception as e:
-        print(f"  ✗ Database models import failed: {e}")
-        errors.append(f"Import error: Database - {e}")
+    for (_, _, label), error in zip(IMPORTS, results):
+        if error is None:
+            print(f"  ✓ {label} import OK")
+        else:
+            print(f"  ✗ {label} import failed: {error}")
+            errors.append(f"Import error: {label} - {error}")
 
     print("\n" + "=" * 60)
 